@@ -0,0 +1,44 @@
+"""
+Encoding and decoding time of each json engine, for configs of different sizes, pretty or compact.
+
+Run from the root of the repository with `python -m benchmarks.bench_engine`.
+"""
+
+import timeit
+
+from configlib import engine
+
+
+def make_document(sections, fields):
+    """A config dict like __get_json_dict__ returns, with `sections` SubConfigs of `fields` fields."""
+    return {
+        'section_%d' % s: dict(
+            {'field_%d' % f: [f, 'value %d' % f, f * 0.5, f % 2 == 0][f % 4] for f in range(fields)},
+            __version__=1,
+        )
+        for s in range(sections)
+    }
+
+
+SIZES = [('small', 5, 5), ('medium', 50, 20), ('large', 500, 50)]
+
+
+def main():
+    print('{:<8} {:<7} {:<8} {:>12} {:>12}'.format('engine', 'size', 'output', 'dumps (us)', 'loads (us)'))
+
+    for size, sections, fields in SIZES:
+        document = make_document(sections, fields)
+        number = max(1, 20000 // (sections * fields))
+
+        for name in sorted(engine.ENGINES):
+            eng = engine.get_engine(name)
+
+            for output, kwargs in [('pretty', dict(indent=True, sort_keys=True)), ('compact', {})]:
+                text = eng.dumps(document, **kwargs)
+                dump = min(timeit.repeat(lambda: eng.dumps(document, **kwargs), number=number, repeat=3)) / number
+                load = min(timeit.repeat(lambda: eng.loads(text), number=number, repeat=3)) / number
+                print('{:<8} {:<7} {:<8} {:12.1f} {:12.1f}'.format(name, size, output, dump * 1e6, load * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Compare attribute reads on a live Config against its frozen snapshot.
+
+Run from the root of the repository with `python -m benchmarks.bench_freeze`.
+"""
+
+import os
+import tempfile
+import timeit
+
+import configlib
+from configlib import config_example
+
+
+class Config(configlib.Config):
+    __config_path__ = os.path.join(tempfile.gettempdir(), 'configlib_bench_freeze.json')
+
+    age = 3
+    name = 'Archibald'
+    colors = config_example.Colors()
+
+
+def main(number=200000):
+    live = Config()
+    frozen = live.__freeze__()
+
+    cases = [
+        ('live   cfg.age', lambda: live.age),
+        ('frozen cfg.age', lambda: frozen.age),
+        ('live   cfg.colors.walls.east', lambda: live.colors.walls.east),
+        ('frozen cfg.colors.walls.east', lambda: frozen.colors.walls.east),
+    ]
+
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print('{:<32} {:8.1f} ns/read'.format(name, best / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
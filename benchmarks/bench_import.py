@@ -0,0 +1,53 @@
+"""
+Time to define a config with 500 subsections, with SubConfig instances or lazy `configlib.sub` defaults.
+
+Run from the root of the repository with `python -m benchmarks.bench_import`.
+"""
+
+import time
+
+SECTIONS = 500
+FIELDS = 10
+
+
+def make_source(lazy: bool):
+    """The source of a config module with SECTIONS SubConfigs of FIELDS fields each."""
+
+    lines = ['import configlib', '']
+    for s in range(SECTIONS):
+        lines.append('class Section%d(configlib.SubConfig):' % s)
+        for f in range(FIELDS):
+            lines.append('    field_%d = %d' % (f, f))
+            lines.append('    __field_%d_hint__ = "The field %d"' % (f, f))
+        lines.append('')
+
+    lines.append('class Config(configlib.Config):')
+    lines.append('    __config_path__ = "unused.json"')
+    for s in range(SECTIONS):
+        default = 'configlib.sub(Section%d)' if lazy else 'Section%d()'
+        lines.append('    section_%d = %s' % (s, default % s))
+
+    return '\n'.join(lines) + '\n'
+
+
+def bench(lazy: bool, repeat=5):
+    # we only time the execution of the module, not its compilation
+    code = compile(make_source(lazy), '<config>', 'exec')
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        exec(code, {'__name__': 'config'})
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    eager = bench(lazy=False)
+    lazy = bench(lazy=True)
+    print('{} subsections of {} fields'.format(SECTIONS, FIELDS))
+    print('SubConfig() defaults      {:8.1f} ms'.format(eager * 1000))
+    print('configlib.sub() defaults  {:8.1f} ms'.format(lazy * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Read latency of a ConfigServer and time to push a change to many subscribers.
+
+Run from the root of the repository with `python -m benchmarks.bench_server`.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from configlib.cache import new_instance
+from configlib.config_example import Config
+from configlib.server import ConfigClient, ConfigServer
+
+
+def bench_reads(client: ConfigClient, number=2000):
+    for name, path in [('whole config', None), ('one field', 'colors.walls.east')]:
+        start = time.perf_counter()
+        for _ in range(number):
+            client.get(path)
+        elapsed = time.perf_counter() - start
+        print('get {:<16} {:8.1f} us/request'.format(name, elapsed / number * 1e6))
+
+
+def bench_fan_out(socket_path, writer: ConfigClient, clients=100, rounds=20):
+    subscribers = [ConfigClient(socket_path) for _ in range(clients)]
+    lock = threading.Lock()
+    received = [0]
+    everyone = threading.Event()
+
+    def on_change(path, value):
+        with lock:
+            received[0] += 1
+            if received[0] == clients:
+                everyone.set()
+
+    for subscriber in subscribers:
+        subscriber.subscribe(on_change)
+
+    times = []
+    for i in range(rounds):
+        received[0] = 0
+        everyone.clear()
+        start = time.perf_counter()
+        writer.set('age', i)
+        everyone.wait()
+        times.append(time.perf_counter() - start)
+
+    print('push to {} clients     {:8.1f} us (best), {:8.1f} us (median)'.format(
+        clients, min(times) * 1e6, sorted(times)[len(times) // 2] * 1e6))
+
+    for subscriber in subscribers:
+        subscriber.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        config = new_instance(Config, os.path.join(directory, 'config.json'))
+        server = ConfigServer(config, os.path.join(directory, 'config.sock'), autosave=1.0).start()
+        client = ConfigClient(server.socket_path)
+
+        bench_reads(client)
+        for clients in (1, 10, 100):
+            bench_fan_out(server.socket_path, client, clients)
+
+        client.close()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
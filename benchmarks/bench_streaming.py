@@ -0,0 +1,61 @@
+"""
+Peak memory of saving a config, building the whole json first or streaming it to the file.
+
+Run from the root of the repository with `python -m benchmarks.bench_streaming`.
+"""
+
+import os
+import tempfile
+import tracemalloc
+
+import configlib
+from configlib.cache import new_instance
+from configlib.core import atomic_write
+
+
+def make_config_class(sections, fields=20, xor_key=b''):
+    """A config with `sections` SubConfigs of `fields` fields each."""
+
+    section = type('Section', (configlib.SubConfig,), {
+        'field_%d' % f: 'some text for the field %d' % f for f in range(fields)
+    })
+    namespace = {'section_%d' % s: configlib.sub(section) for s in range(sections)}
+    namespace['__xor_key__'] = xor_key
+    return type('Config', (configlib.Config,), namespace)
+
+
+def save_whole(config):
+    """What __save__ did before: the whole dict, then the whole string, then the crypted copy."""
+    atomic_write(config.__config_path__, config.__encode__(config.__get_json_dict__()))
+
+
+def peak_memory(func, config):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(config)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    print('{:<9} {:<5} {:>10} {:>14} {:>14}'.format('sections', 'xor', 'file (kB)', 'whole (kB)', 'streamed (kB)'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for xor_key in (b'', b'secret key'):
+            for sections in (10, 100, 1000, 5000):
+                config = new_instance(make_config_class(sections, xor_key=xor_key),
+                                      os.path.join(directory, '%d-%s.json' % (sections, bool(xor_key))))
+                # create all the lazy SubConfigs, we only measure the saving
+                config.__get_json_dict__()
+
+                whole = peak_memory(save_whole, config)
+                streamed = peak_memory(lambda c: c.__write__(), config)
+                size = os.path.getsize(config.__config_path__)
+
+                print('{:<9} {:<5} {:10.0f} {:14.0f} {:14.0f}'.format(
+                    sections, 'yes' if xor_key else 'no', size / 1024, whole / 1024, streamed / 1024))
+
+
+if __name__ == '__main__':
+    main()
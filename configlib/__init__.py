@@ -1,4 +1,8 @@
-from .core import Config, SubConfig, update_config, Singleton
+from .core import Config, SubConfig, update_config, Singleton, sub
 from .conftypes import color, path, ConfigType, Python
+from .frozen import FrozenConfig
+from .cache import ConfigCache
+from .autosave import AutoSaver
 
-__all__ = ['conftypes', 'Config', 'SubConfig', 'update_config', 'color', 'path', 'ConfigType', 'Python', 'Singleton']
+__all__ = ['conftypes', 'Config', 'SubConfig', 'sub', 'update_config', 'color', 'path', 'ConfigType', 'Python',
+           'Singleton', 'FrozenConfig', 'ConfigCache', 'AutoSaver']
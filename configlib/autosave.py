@@ -0,0 +1,118 @@
+"""
+Background saving of a configuration.
+
+Wrapping every change in `with config:` rewrites the whole file each time.
+An `AutoSaver` instead only marks the config as dirty on each change and a
+background thread saves it at most once per interval, so a burst of changes
+costs a single write. Use it through `config.__autosave__(interval)`.
+"""
+
+import atexit
+import logging
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import configlib
+
+LOGGER = logging.getLogger("configlib")
+
+AutoSaveStats = namedtuple('AutoSaveStats', ['requested', 'performed', 'coalesced', 'failed'])
+
+
+class AutoSaver(object):
+    """
+    Save a config in a background thread when it is dirty, at most once every `interval` seconds.
+
+    :param config: the config to save
+    :param interval: the minimum time in seconds between two writes
+    """
+
+    def __init__(self, config: 'configlib.core.BaseConfig', interval=1.0):
+        self.config = config
+        self.interval = interval
+
+        self.requested = 0  # number of changes
+        self.performed = 0  # number of writes
+        self.failed = 0
+
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None  # type: threading.Thread
+
+    def mark_dirty(self):
+        """Schedule a save of the config."""
+        with self._lock:
+            self.requested += 1
+            self._dirty = True
+        self._wake.set()
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='configlib-autosave', daemon=True)
+        self._thread.start()
+        # the thread is a daemon, so we have to save the last changes ourselves
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background thread and save the pending changes."""
+
+        atexit.unregister(self.stop)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Save the config now if it is dirty. Return whether it was saved."""
+
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return False
+                self._dirty = False
+                self._wake.clear()
+
+            try:
+                self.config.__save__()
+            except Exception:
+                LOGGER.exception('Autosave of %s failed', self.config.__config_path__)
+                with self._lock:
+                    self.failed += 1
+                    self._dirty = True
+                # try again after the next interval
+                self._wake.set()
+                return False
+
+            self.performed += 1
+            return True
+
+    def stats(self):
+        """Return how many saves were requested, performed and coalesced."""
+        with self._lock:
+            coalesced = max(0, self.requested - self.performed)
+            return AutoSaveStats(self.requested, self.performed, coalesced, self.failed)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            if self._stop.is_set():
+                break
+
+            # let the changes of the next interval pile up
+            if self._stop.wait(self.interval):
+                break
+
+            self.flush()
@@ -0,0 +1,203 @@
+"""
+Bounded cache of configurations sharing the same schema but stored in different files.
+
+`Config` is a singleton, which is perfect for the config of an application
+but not for a service holding one configuration per tenant. `ConfigCache`
+keeps one instance of a `Config` class per path, in least recently used order,
+and forgets the coldest ones when there are too many or when their files
+weigh too much.
+
+    config = MyConfig.__for_path__('tenants/42.json')
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+LOGGER = logging.getLogger("configlib")
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'invalidations', 'currsize', 'maxsize',
+                                     'currbytes', 'max_bytes'])
+
+
+def file_stamp(path):
+    """Return what identifies a version of the file: its mtime and size, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def new_instance(configclass: type, path: str, strict=False):
+    """Create an instance of a Config bound to `path`, bypassing the singleton."""
+    config = object.__new__(configclass)
+    # not a field, so it is set on the instance and shadows the class attribute
+    config.__config_path__ = path
+    config.__init__(strict)
+    return config
+
+
+class _Entry(object):
+    __slots__ = ('config', 'stamp')
+
+    def __init__(self, config, stamp):
+        self.config = config
+        self.stamp = stamp
+
+    @property
+    def size(self):
+        return self.stamp[1] if self.stamp else 0
+
+
+class ConfigCache(object):
+    """
+    LRU cache of instances of one Config class, keyed by their path.
+
+    :param configclass: the Config class of every config in the cache
+    :param maxsize: the maximum number of configs kept in memory
+    :param max_bytes: the maximum total size of the files of the configs in memory, or None for no limit.
+    """
+
+    def __init__(self, configclass: type, maxsize=128, max_bytes=None):
+        self.configclass = configclass
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # type: OrderedDict[str, _Entry]
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # the paths being loaded, without the lock, and the event set when they are done
+        self._loading = {}  # type: dict[str, threading.Event]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
+
+    def get(self, path: str):
+        """
+        Return the config stored at `path`, loading it if it is not in the cache.
+
+        If the file changed since it was loaded, the cached config is reloaded in place,
+        so references to it stay valid. The changes written by the config itself do not count.
+        The files are read and parsed without holding the lock of the cache, so a slow load
+        only makes wait the other threads that want the same path.
+        """
+
+        path = os.path.abspath(path)
+
+        while True:
+            stamp = file_stamp(path)
+
+            with self._lock:
+                loading = self._loading.get(path)
+                if loading is None:
+                    entry = self._entries.get(path)
+
+                    if entry is None:
+                        self.misses += 1
+                    else:
+                        self._entries.move_to_end(path)
+
+                        if entry.stamp != stamp and entry.config.__written__ == stamp:
+                            # the config saved itself, it is already up to date
+                            self._set_stamp(entry, stamp)
+
+                        if entry.stamp == stamp:
+                            self.hits += 1
+                            return entry.config
+
+                        LOGGER.debug('%s changed on disk, reloading it', path)
+                        self.invalidations += 1
+
+                    loading = self._loading[path] = threading.Event()
+                    break
+
+            # an other thread is loading this path, we look again once it is done
+            loading.wait()
+
+        try:
+            if entry is None:
+                config = new_instance(self.configclass, path)
+            else:
+                config = entry.config
+                self._reload(config)
+        except BaseException:
+            with self._lock:
+                del self._loading[path]
+            loading.set()
+            raise
+
+        with self._lock:
+            del self._loading[path]
+            if entry is None:
+                entry = _Entry(config, None)
+
+            if self._entries.get(path) is entry:
+                self._set_stamp(entry, stamp)
+                self._entries.move_to_end(path)
+            else:
+                # new, or evicted or invalidated while it was loaded: its size is not counted
+                entry.stamp = stamp
+                self._entries[path] = entry
+                self._bytes += entry.size
+            self._evict()
+        loading.set()
+
+        return config
+
+    def _set_stamp(self, entry: _Entry, stamp):
+        self._bytes -= entry.size
+        entry.stamp = stamp
+        self._bytes += entry.size
+
+    @staticmethod
+    def _reload(config):
+        """Load the config again, starting from the defaults so the fields removed from the file are reset."""
+
+        defaults = object.__new__(type(config))
+        defaults.__copy_defaults__()
+
+        with config.__loading_scope__():
+            config.__update__(defaults.__get_json_dict__())
+        config.__load__()
+
+    def invalidate(self, path: str):
+        """Remove the config at `path` from the cache. The next `get` will load it again."""
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self._bytes -= entry.size
+                self.invalidations += 1
+                entry.config.__close__()
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                entry.config.__close__()
+            self._entries.clear()
+            self._bytes = 0
+
+    def cache_info(self):
+        """Return the statistics of the cache, like `functools.lru_cache`."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.invalidations,
+                             len(self._entries), self.maxsize, self._bytes, self.max_bytes)
+
+    def _evict(self):
+        # the most recent entry is always kept, even if alone it is bigger than the budget
+        while len(self._entries) > 1 and (len(self._entries) > self.maxsize or
+                                          self.max_bytes is not None and self._bytes > self.max_bytes):
+            path, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            entry.config.__close__()
+            LOGGER.debug('evicting %s from the config cache', path)
@@ -29,10 +29,10 @@ class Colors(configlib.SubConfig):
     __light_type__ = conftypes.color
     __light_hint__ = 'The color of your lights'
 
-    walls = WallColors()
+    walls = configlib.sub(WallColors)
     __walls_hint__ = 'The colors of the walls of your secret place'
 
-    castle = WallColors()
+    castle = configlib.sub(WallColors)
     __castle_hint__ = 'The colors of the walls of your castle'
 
 
@@ -52,7 +52,7 @@ class Config(configlib.Config):
     bald = True
     __bald_hint__ = "Are you bald ?"
 
-    colors = Colors()
+    colors = configlib.sub(Colors)
     __colors_hint__ = 'The colors around you.'
 
     def get_fancy_name(self):
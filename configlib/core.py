@@ -43,17 +43,23 @@ To use the configlib in your project, just create a file name `conf.py` awith th
 Made with love by ddorn (https://github.com/ddorn/)
 """
 
+import importlib
 import inspect
-import json
 import logging
 import os
+import shutil
+import threading
+from contextlib import contextmanager
 from itertools import cycle
 from typing import Tuple
 
 import click
 
 from .prompting import prompt_file
-from . import conftypes
+from . import conftypes, engine, fingerprint, frozen, migrations, schema, streaming
+from .autosave import AutoSaver
+from .cache import ConfigCache, file_stamp
+from .journal import Journal
 
 LOGGER = logging.getLogger("configlib")
 
@@ -67,6 +73,11 @@ except ImportError:
     TerminalFormatter = None  # type: type
     LOGGER.warning('Pygment not installed')
 
+# for each thread, how many times each config (by id) is being filled from its file, see BaseConfig.__loading__
+_LOADING = threading.local()
+# so two threads never create two caches for the same class in __for_path__
+_TENANTS_LOCK = threading.Lock()
+
 TYPE_TO_CLICK_TYPE = {
     int: click.INT,
     float: click.FLOAT,
@@ -81,6 +92,41 @@ def is_config_field(attr: str):
     return not (attr.startswith('_') or attr.endswith('_'))
 
 
+@contextmanager
+def atomic_open(path: str, mode='w'):
+    """
+    Open a file to write at `path`, that replaces it only once it is completely written.
+
+    Like writing to `path` directly, a symlink is followed and the permissions of the file are kept.
+    """
+
+    # we replace the target of the link, not the link
+    path = os.path.realpath(path)
+    # the temporary file must be on the same file system for os.replace to be atomic
+    tmp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        try:
+            shutil.copymode(path, tmp)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write(path: str, data):
+    """Write the str or bytes `data` to `path`, so that readers never see a half written file."""
+    with atomic_open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+
 # ✓
 def prompt_update_all(config: 'Config'):
     """Prompt each field of the configuration to the user."""
@@ -144,9 +190,23 @@ class BaseConfig(object):
     __config_path__ = 'config.json'
     __version__ = 1
     __xor_key__ = b''
+    # the name of the json engine, like 'json' or 'orjson'. None picks the fastest installed
+    __json_engine__ = None
+
+    # the (config, field) that holds this config, when it is a SubConfig
+    __parent__ = None  # type: Tuple[BaseConfig, str]
+    __autosaver__ = None  # type: AutoSaver
+    # append each change to a journal next to __config_path__ instead of rewriting the file, see journal.py
+    __journal__ = False
+    # the journal is folded into the file when it is bigger than this
+    __journal_max_bytes__ = 64 * 1024
+    __journal_log__ = None  # type: Journal
+    # the mtime and size of the file just after the config last wrote it, so the cache does not reload it
+    __written__ = None
 
     # ✓
     def __init__(self, strict=False):
+        self.__copy_defaults__()
         self.__load__(strict)
 
     # ✓
@@ -166,27 +226,73 @@ class BaseConfig(object):
             if not hasattr(cls, field_type_name):
                 # we add the type of the default
                 default = getattr(cls, field)
-                if isinstance(default, SubConfig):
+                if isinstance(default, sub):
+                    setattr(cls, field_type_name, conftypes.SubConfigType(default.sub_config_class))
+                elif isinstance(default, SubConfig):
                     setattr(cls, field_type_name, conftypes.SubConfigType(type(default)))
                 else:
                     setattr(cls, field_type_name, type(default))
                     LOGGER.debug('In %s the field %s has now type %s because the default is %r', cls, field,
                                   type(default), default)
 
+    def __copy_defaults__(self):
+        """Give the instance its own copy of the default SubConfigs, so instances never share them."""
+        cls_dict = type(self).__dict__
+        for field in self:
+            if field in self.__dict__ or isinstance(cls_dict[field], sub):
+                # lazy SubConfigs are created for each instance anyway
+                continue
+
+            default = self[field]
+            if isinstance(default, SubConfig):
+                copy = type(default)(default.__get_json_dict__())
+                object.__setattr__(copy, '__parent__', (self, field))
+                object.__setattr__(self, field, copy)
+
+    @property
+    def __loading__(self):
+        """
+        True while the config is filled from its file by the current thread.
+
+        The values set meanwhile come from the file, so they are neither saved nor journaled.
+        The other threads still save theirs.
+        """
+        return id(self) in getattr(_LOADING, 'depths', ())
+
+    @contextmanager
+    def __loading_scope__(self):
+        """Context manager in which the fields set by this thread are loaded, not changed. It can be nested."""
+
+        depths = _LOADING.__dict__.setdefault('depths', {})
+        key = id(self)
+        depths[key] = depths.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            depths[key] -= 1
+            if not depths[key]:
+                del depths[key]
+
+    def __engine__(self):
+        """The JsonEngine used to encode and decode the config, see engine.py."""
+        return engine.get_engine(self.__json_engine__)
+
     def __str__(self):
-        return json.dumps(self.__get_json_dict__(), indent=4, sort_keys=True)
+        return self.__engine__().dumps(self.__get_json_dict__(), indent=True, sort_keys=True)
 
     def __repr__(self):
-        return json.dumps(self.__get_json_dict__(), sort_keys=True)
+        return self.__engine__().dumps(self.__get_json_dict__(), sort_keys=True)
     # ✓
     def __iter__(self):
         """Iterate over the fields, sorted."""
 
         # the fields are all class attributes,
         # so they are accessible from everywhere
-        keys = sorted(type(self).__dict__)
+        cls_dict = type(self).__dict__
+        keys = sorted(cls_dict)
         for key in keys:
-            if is_config_field(key) and not callable(self[key]):
+            # we don't want to create the lazy SubConfigs just to know if they are callable
+            if is_config_field(key) and (isinstance(cls_dict[key], sub) or not callable(self[key])):
                 yield key
 
     def __contains__(self, item: str):
@@ -199,7 +305,9 @@ class BaseConfig(object):
                 return False
         return is_config_field(item) and hasattr(self, item)
 
-    def __load__(self, strict=False):
+    def __read__(self):
+        """Read and parse the file at __config_path__. Return an empty dict if there is nothing to load."""
+
         mode = 'rb' if self.__xor_key__ else 'r'
 
         try:
@@ -208,36 +316,112 @@ class BaseConfig(object):
             LOGGER.info('Read %d chars from %s', len(file), self.__config_path__)
         except FileNotFoundError:
             # if no config was ever created, it's time to make one
-            file = '{}'
             LOGGER.info('Config file not found, creating empty one')
-        else:
-            if self.__xor_key__:
-                file = self.__decrypt__(file).decode()
+            return {}
 
-        conf = json.loads(file)  # type: dict
+        conf = self.__decode__(file)  # type: dict
 
         if conf.get("__version__", self.__version__) != self.__version__:
-            logging.info("Config version mismatch (saved: %s, current: %s). Restoring default config.",
-                         conf["__version__"], self.__version__)
-            conf = {}
+            try:
+                conf = migrations.migrate(type(self), conf)
+            except migrations.MigrationError as e:
+                LOGGER.warning("Could not migrate %s (saved: %s, current: %s): %s. Restoring default config.",
+                               self.__config_path__, conf["__version__"], self.__version__, e)
+                conf = {}
+            else:
+                LOGGER.info('Migrated %s to version %s', self.__config_path__, self.__version__)
+
+        return conf
+
+    def __decode__(self, file):
+        """Parse the content of a config file, decrypting it if needed."""
+        if self.__xor_key__:
+            file = self.__decrypt__(file).decode()
+        return self.__engine__().loads(file)
+
+    def __encode__(self, json_dict: dict):
+        """Return the content of the config file for a json dict, crypted if needed."""
+
+        engine = self.__engine__()
+        if self.__xor_key__:
+            # nobody reads it, no need to make it pretty
+            jsonstr = engine.dumps(json_dict).encode()
+            return self.__crypt__(jsonstr)
+        return engine.dumps(json_dict, indent=True, sort_keys=True)
+
+    @classmethod
+    def __migration__(cls, from_version, to_version):
+        """
+        Decorator to register a function that upgrades the json dict of a config from a version to an other.
+
+            @Config.__migration__(1, 2)
+            def rename_age(conf):
+                conf['age_in_days'] = conf.pop('age', 0) * 365
+                return conf
+
+        The migrations are chained when loading a file of an older version, instead of restoring the defaults.
+        """
+        return migrations.register(cls, from_version, to_version)
+
+    def __load__(self, strict=False):
+        if self.__journal__:
+            if self.__journal_log__ is None:
+                self.__journal_log__ = Journal(self)
+            # reads the file and then the changes made since
+            self.__journal_log__.refresh(strict)
+            return
 
-        self.__update__(conf, strict)
+        with self.__loading_scope__():
+            self.__update__(self.__read__(), strict)
 
     # ✓
     def __save__(self):
         """Save the config to __config_path__ in a json format."""
 
-        if self.__xor_key__:
-            jsonstr = json.dumps(self.__get_json_dict__()).encode()
-            jsonstr = self.__crypt__(jsonstr)
+        if self.__journal__:
+            # the file is a checkpoint of the journal
+            self.__journal_log__.compact()
         else:
-            jsonstr = json.dumps(self.__get_json_dict__(), indent=4, sort_keys=True)
+            self.__write__()
+
+    def __write__(self):
+        """Write the whole config to __config_path__, streaming it without building the json in memory."""
+
+        size = streaming.dump(self, self.__config_path__)
+        self.__written__ = file_stamp(self.__config_path__)
+        LOGGER.info('saved %d bytes at %s', size, self.__config_path__)
+
+    def __refresh__(self):
+        """Apply the changes that other processes wrote in the journal since the last refresh."""
+        if not self.__journal__:
+            raise ValueError('Only configs with __journal__ = True can be refreshed')
+        self.__journal_log__.refresh()
+
+    def __locked__(self):
+        """
+        Context manager that holds the lock of the journal, for read-modify-write updates across processes.
+
+            with config.__locked__():
+                config.counter += 1
+        """
+        if not self.__journal__:
+            raise ValueError('Only configs with __journal__ = True can be locked')
+        return self.__journal_log__.locked()
 
-        LOGGER.info('saving %d chars at %s', len(jsonstr), self.__config_path__)
+    def __close__(self):
+        """Release the files kept open by the config. It can still be used, they are opened again when needed."""
+        if self.__journal_log__ is not None:
+            self.__journal_log__.close()
 
-        mode = 'wb' if self.__xor_key__ else 'w'
-        with open(self.__config_path__, mode) as f:
-            f.write(jsonstr)
+    def __get_json_value__(self, field: str):
+        """Return the value of a field as it is stored in the json."""
+
+        supposed_type = self.__type__(field)
+        # we may need to convert the to something json knows
+        # if the type is a custom type
+        if isinstance(supposed_type, conftypes.ConfigType):
+            return supposed_type.save(self[field])
+        return self[field]
 
     def __get_json_dict__(self):
         json_dict = {}
@@ -302,16 +486,13 @@ class BaseConfig(object):
 
         if conftypes.is_valid(value, supposed_type):
             # everything is correct, we assign is directly
-            object.__setattr__(self, field, value)
             LOGGER.debug('valid')
 
-
         elif isinstance(supposed_type, conftypes.ConfigType):
             # we may need to convert it
             LOGGER.debug('try to convert the value through ConfigType')
             try:
                 value = supposed_type.load(value)
-                object.__setattr__(self, field, value)
             except Exception:
                 LOGGER.warning('fail loading %r of type %s but supposed %s', value, type(value), supposed_type)
                 raise ValueError('fail loading %r of type %s but supposed %s' % (value, type(value), supposed_type))
@@ -320,7 +501,6 @@ class BaseConfig(object):
             try:
                 LOGGER.debug('try to convert the value throught click.ParamType')
                 value = TYPE_TO_CLICK_TYPE[supposed_type](value)
-                object.__setattr__(self, field, value)
             except Exception:
                 LOGGER.warning('fail loading %r of type %s but supposed %s', value, type(value), supposed_type)
                 raise ValueError('fail loading %s of type %s but supposed %s' % (value, type(value), supposed_type))
@@ -329,6 +509,57 @@ class BaseConfig(object):
             LOGGER.warning('fail loading %r of type %s but supposed %s', value, type(value), supposed_type)
             raise ValueError('fail loading %s of type %s but supposed %s' % (value, type(value), supposed_type))
 
+        object.__setattr__(self, field, value)
+        if isinstance(value, SubConfig):
+            object.__setattr__(value, '__parent__', (self, field))
+        self.__changed__(field)
+
+    def __changed__(self, field: str):
+        """
+        Called each time a field is successfully set.
+
+        :param field: the dotted path of the field, relative to this config.
+        """
+
+        fingerprint.forget(self, field)
+
+        if self.__parent__ is not None:
+            # the parent changes too
+            parent, name = self.__parent__
+            parent.__changed__(name + '.' + field)
+            return
+
+        if self.__loading__:
+            # nothing new to save
+            return
+
+        if self.__journal__:
+            self.__journal_log__.append(field, self.__get_json_value__(field))
+
+        if self.__autosaver__ is not None:
+            self.__autosaver__.mark_dirty()
+
+    def __autosave__(self, interval=1.0):
+        """
+        Save the config in a background thread, at most once every `interval` seconds.
+
+        Every change marks the config as dirty and the changes made in the same interval
+        are written at once. The pending changes are also saved when the interpreter exits.
+        Call with `interval=None` to save the pending changes and stop.
+
+        :return: the AutoSaver, whose `stats()` tells how many writes were coalesced.
+        """
+
+        if self.__autosaver__ is not None:
+            self.__autosaver__.stop()
+            self.__autosaver__ = None
+
+        if interval is not None:
+            self.__autosaver__ = AutoSaver(self, interval)
+            self.__autosaver__.start()
+
+        return self.__autosaver__
+
     __setattr__ = __setitem__
 
     # ✓
@@ -386,13 +617,20 @@ class BaseConfig(object):
         """Print the json that stores the data with colors."""
 
         try:
-            with open(self.__config_path__, 'r', encoding='utf-8') as f:
+            with open(self.__config_path__, 'rb') as f:
                 file = f.read()
         except FileNotFoundError:
             click.echo("You don't have any configuration.")
             return
 
-        file = json.dumps(json.loads(file), indent=4, sort_keys=True)
+        if self.__xor_key__:
+            file = self.__engine__().dumps(self.__decode__(file), indent=True, sort_keys=True)
+        else:
+            file = file.decode('utf-8')
+            if not file.startswith('{\n'):
+                # not written by __write__, which already indents it, but compact or edited by hand
+                engine = self.__engine__()
+                file = engine.dumps(engine.loads(file), indent=True, sort_keys=True)
 
         # I've set pygments to an help str when there is an import error
         if isinstance(pygments, str):
@@ -467,21 +705,116 @@ class BaseConfig(object):
         """Get the hint given by __field_hint__ or the field name if not defined."""
         return getattr(self, '__{field}_hint__'.format(field=field), field)
 
+    def __freeze__(self):
+        """Return an immutable and hashable snapshot of the config, with attribute reads as fast as a slot."""
+        return frozen.freeze(self)
+
+    def __fingerprint__(self):
+        """
+        Return a hash of the content of the config, stable across processes and python versions.
+
+        It is updated incrementally: after a change, only the digests from the changed field to the root are computed.
+        """
+        return fingerprint.fingerprint(self)
+
+    def __diff__(self, other: 'BaseConfig'):
+        """Return the dotted paths of the fields that are different in `other`."""
+        return fingerprint.diff(self, other)
+
+    @classmethod
+    def __json_schema__(cls):
+        """Return the JSON Schema of the files of this config."""
+        return schema.json_schema(cls)
+
+    @classmethod
+    def __validate__(cls, document: dict):
+        """
+        Check a parsed config file without loading it.
+
+        :return: the list of (dotted path, message) of the errors, empty when the document is valid.
+        """
+        return schema.compile_validator(cls)(document)
+
     def __reset__(self):
         try:
             os.remove(self.__config_path__)
         except FileNotFoundError:
             pass
         self.__class__()  # we create a new instance to load it from nowhere
+        cls_dict = type(self).__dict__
         for field in self:
-            if isinstance(self[field], SubConfig):
+            if isinstance(cls_dict[field], sub):
+                # it will be created again on the next access
+                self.__dict__.pop(field, None)
+                self.__changed__(field)
+            elif isinstance(self[field], SubConfig):
                 self[field] = self[field].__class__()
 
 
+class sub(object):
+    """
+    Lazy default of a SubConfig field.
+
+        class Colors(configlib.SubConfig):
+            walls = configlib.sub(WallColors)
+
+    Unlike `walls = WallColors()`, nothing is created when the class is defined.
+    Each config gets its own SubConfig the first time the field is accessed.
+
+    :param sub_config_class: the SubConfig class of the field
+    :param dct: the values that differ from the defaults of `sub_config_class`
+    """
+
+    def __init__(self, sub_config_class: 'type(SubConfig)', dct: dict = None):
+        self.sub_config_class = sub_config_class
+        self.dct = dct
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value = self.sub_config_class(self.dct)
+        object.__setattr__(value, '__parent__', (instance, self.name))
+        # this is not a data descriptor, so the instance attribute is used from now on.
+        # If an other thread created one at the same time, both use the first stored
+        return instance.__dict__.setdefault(self.name, value)
+
+    def __repr__(self):
+        return 'sub(%s)' % self.sub_config_class.__name__
+
+
 class Config(BaseConfig, metaclass=Singleton):
     # We make the config singletons because everybody wants to have the same config everywhere in his code
     # but not the subconfig, as we can have more than one of each in each Config
-    pass
+
+    # the configs returned by __for_path__, one cache per class
+    __tenants__ = None  # type: ConfigCache
+    __tenants_maxsize__ = 128
+    __tenants_max_bytes__ = None
+
+    @classmethod
+    def __for_path__(cls, path: str):
+        """
+        Get the config stored at `path`, which is not the singleton.
+
+        Instances are kept in a LRU cache bounded by `__tenants_maxsize__` configs
+        and `__tenants_max_bytes__` bytes of files, and reloaded when their file changes.
+        The statistics are available with `cls.__tenants__.cache_info()`.
+        """
+
+        # not getattr, the cache of the parent class holds other configs
+        cache = cls.__dict__.get('__tenants__')
+        if cache is None:
+            with _TENANTS_LOCK:
+                cache = cls.__dict__.get('__tenants__')
+                if cache is None:
+                    cache = ConfigCache(cls, cls.__tenants_maxsize__, cls.__tenants_max_bytes__)
+                    cls.__tenants__ = cache
+        return cache.get(path)
 
 
 class SubConfig(BaseConfig):
@@ -489,6 +822,7 @@ class SubConfig(BaseConfig):
     def __init__(self, dct=None):
         dct = dct or {}
 
+        self.__copy_defaults__()
         self.__update__(dct)
 
 
@@ -603,4 +937,19 @@ def update_config(configclass: type(Config)):
     LOGGER.debug('end command')
 
 
-__all__ = ['Config', 'SubConfig', 'update_config']
+def import_config_class(spec: str):
+    """Import a Config class from a 'package.module:ClassName' string."""
+
+    module_name, _, class_name = spec.partition(':')
+    if not class_name:
+        raise click.BadParameter('%s should be like package.module:ClassName' % spec)
+
+    module = importlib.import_module(module_name)
+    configclass = getattr(module, class_name, None)
+    if not (isinstance(configclass, type) and issubclass(configclass, BaseConfig)):
+        raise click.BadParameter('%s is not a Config class' % spec)
+
+    return configclass
+
+
+__all__ = ['Config', 'SubConfig', 'update_config', 'sub']
@@ -0,0 +1,134 @@
+"""
+The json engines used to encode and decode configurations.
+
+Every encoding and decoding of a config goes through an engine. The default
+one is orjson when it is installed, as it is much faster, or the json module
+of the standard library. Set `__json_engine__ = 'json'` in a config to force
+the standard library.
+
+Output meant for humans (the config file, `str()`, `repr()` and `__show__`)
+is sorted and indented, the rest is as compact and fast as possible.
+"""
+
+import json
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonEngine(object):
+    """Engine using the json module of the standard library."""
+
+    name = 'json'
+    # the indentation of the pretty output
+    indent = 4
+
+    def dumps(self, obj, indent=False, sort_keys=False, ensure_ascii=True):
+        """
+        Encode `obj` to a str.
+
+        :param indent: indent the output with `self.indent` spaces
+        :param sort_keys: sort the keys of the objects
+        :param ensure_ascii: escape the non ascii characters
+        """
+        if indent:
+            return json.dumps(obj, indent=self.indent, sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+        return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+
+    def dumpb(self, obj):
+        """Encode `obj` to compact utf-8 bytes."""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+
+    def loads(self, data):
+        """Decode a str or utf-8 bytes."""
+        return json.loads(data)
+
+    def __repr__(self):
+        return '<JsonEngine %s>' % self.name
+
+
+def has_non_finite(obj):
+    """Whether there is a NaN or an infinite float somewhere in `obj`."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(has_non_finite(value) for value in obj)
+    return False
+
+
+class OrjsonEngine(JsonEngine):
+    """
+    Engine using orjson.
+
+    orjson can not encode everything the standard library can, like integers bigger than 64 bits or
+    dicts whose keys are not strings, so it falls back to the standard library in that case.
+    It also silently writes NaN and infinities as null, so when there is a null in the output
+    and one of them in `obj`, the standard library writes them as NaN and Infinity instead.
+    """
+
+    name = 'orjson'
+    # orjson can not indent with more spaces
+    indent = 2
+
+    def dumps(self, obj, indent=False, sort_keys=False, ensure_ascii=True):
+        option = 0
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        try:
+            data = orjson.dumps(obj, option=option)
+        except TypeError:
+            return super().dumps(obj, indent, sort_keys, ensure_ascii)
+
+        if b'null' in data and has_non_finite(obj):
+            return super().dumps(obj, indent, sort_keys, ensure_ascii)
+
+        text = data.decode()
+        if ensure_ascii and not text.isascii():
+            return super().dumps(obj, indent, sort_keys, ensure_ascii)
+        return text
+
+    def dumpb(self, obj):
+        try:
+            data = orjson.dumps(obj)
+        except TypeError:
+            return super().dumpb(obj)
+
+        if b'null' in data and has_non_finite(obj):
+            return super().dumpb(obj)
+        return data
+
+    def loads(self, data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # the standard library is more lenient, for instance with NaN
+            return super().loads(data)
+
+
+ENGINES = {'json': JsonEngine()}
+if orjson is not None:
+    ENGINES['orjson'] = OrjsonEngine()
+
+
+def get_engine(name: str = None):
+    """
+    Return the engine with the given name, or the fastest available if `name` is None.
+
+    :raise ValueError: if the engine is unknown or not installed.
+    """
+
+    if name is None:
+        return ENGINES.get('orjson', ENGINES['json'])
+
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError('Unknown or not installed json engine %r, available: %s' % (name, ', '.join(ENGINES)))
@@ -0,0 +1,104 @@
+"""
+Content fingerprints of configurations.
+
+The fingerprint of a config is a Merkle hash: the digest of a field is the
+sha256 of its canonical json, and the digest of a config is the sha256 of the
+names and digests of all its fields, so a SubConfig only contributes the
+digest of its own fingerprint.
+
+Configs keep the digests of their fields and setting a field only forgets
+the digests on the way from that field to the root, so computing the
+fingerprint again only hashes what changed. It does not see the mutations of
+a value in place, like `config.pet_names.append('bobi')`; set the field again instead.
+
+The encoding only depends on json and sha256, so fingerprints are the same
+in every process and with every version of python.
+"""
+
+import hashlib
+import json
+from typing import TYPE_CHECKING
+
+from . import conftypes
+
+if TYPE_CHECKING:
+    import configlib
+
+
+def value_digest(value):
+    """Digest of a json value."""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def fingerprint(config: 'configlib.core.BaseConfig'):
+    """Return the fingerprint of the config, hashing again only the fields that changed."""
+
+    from .core import SubConfig
+
+    cached = config.__dict__.get('__fingerprint_cache__')
+    if cached is not None:
+        return cached
+
+    digests = config.__dict__.get('__digests__')
+    if digests is None:
+        digests = {}
+        object.__setattr__(config, '__digests__', digests)
+
+    node = hashlib.sha256()
+    node.update(b'__version__\0' + value_digest(config.__version__).encode() + b'\n')
+
+    for field in config:
+        digest = digests.get(field)
+        if digest is None:
+            value = config[field]
+            supposed_type = config.__type__(field)
+
+            if isinstance(value, SubConfig):
+                digest = value.__fingerprint__()
+            else:
+                if isinstance(supposed_type, conftypes.ConfigType):
+                    value = supposed_type.save(value)
+                digest = value_digest(value)
+            digests[field] = digest
+
+        node.update(field.encode() + b'\0' + digest.encode() + b'\n')
+
+    cached = node.hexdigest()
+    object.__setattr__(config, '__fingerprint_cache__', cached)
+    return cached
+
+
+def forget(config: 'configlib.core.BaseConfig', field: str):
+    """Forget the digests that depend on `field`, a dotted path relative to `config`."""
+
+    object.__setattr__(config, '__fingerprint_cache__', None)
+    digests = config.__dict__.get('__digests__')
+    if digests:
+        digests.pop(field.partition('.')[0], None)
+
+
+def diff(config: 'configlib.core.BaseConfig', other: 'configlib.core.BaseConfig', prefix=''):
+    """Return the dotted paths of the fields that differ, looking only in the SubConfigs that differ."""
+
+    from .core import SubConfig
+
+    if config.__fingerprint__() == other.__fingerprint__():
+        return []
+
+    fields = set(config) | set(other)
+    mine = config.__dict__['__digests__']
+    theirs = other.__dict__['__digests__']
+
+    different = []
+    for field in sorted(fields):
+        if mine.get(field) == theirs.get(field):
+            continue
+
+        if field in mine and field in theirs and isinstance(config[field], SubConfig) \
+                and isinstance(other[field], SubConfig):
+            different.extend(diff(config[field], other[field], prefix + field + '.'))
+        else:
+            different.append(prefix + field)
+
+    return different
@@ -0,0 +1,129 @@
+"""
+Immutable snapshots of a configuration.
+
+A live `Config` goes through `__getattribute__` and its instance/class dict
+fallbacks on every read. For hot loops, `config.__freeze__()` returns a copy
+of the current values stored in a class made only of `__slots__`, so
+reading `frozen.colors.walls.east` costs a plain slot lookup per level.
+
+The frozen classes are generated once per config class and cached on it.
+"""
+
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+from . import conftypes
+
+if TYPE_CHECKING:
+    import configlib
+
+
+class FrozenConfig(object):
+    """Base of all the generated snapshot classes. Instances are immutable and hashable."""
+
+    __slots__ = ('__hash',)
+    __fields__ = ()  # type: tuple
+    __config_class__ = None  # type: type
+
+    def __setattr__(self, key, value):
+        raise AttributeError('%s is frozen, cannot set %s' % (type(self).__name__, key))
+
+    def __delattr__(self, item):
+        raise AttributeError('%s is frozen, cannot delete %s' % (type(self).__name__, item))
+
+    def __iter__(self):
+        return iter(self.__fields__)
+
+    def __len__(self):
+        return len(self.__fields__)
+
+    def __getitem__(self, item: str):
+        # same dotted access as the live config
+        if '.' in item:
+            item, _, sub = item.partition('.')
+            return self[item][sub]
+        if item not in self.__fields__:
+            raise KeyError(item)
+        return getattr(self, item)
+
+    def __values__(self):
+        return tuple(getattr(self, field) for field in self.__fields__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__values__() == other.__values__()
+
+    def __hash__(self):
+        try:
+            return object.__getattribute__(self, '_FrozenConfig__hash')
+        except AttributeError:
+            pass
+        h = hash((type(self), _hashable(self.__values__())))
+        object.__setattr__(self, '_FrozenConfig__hash', h)
+        return h
+
+    def __repr__(self):
+        values = ', '.join('%s=%r' % (field, getattr(self, field)) for field in self.__fields__)
+        return '%s(%s)' % (type(self).__name__, values)
+
+
+def _hashable(value):
+    """Convert the read-only mappings into something hashable."""
+    if isinstance(value, MappingProxyType):
+        return frozenset((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, tuple):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _freeze_value(value):
+    """Convert mutable containers into their immutable counterpart."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze_value(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze_value(v) for k, v in value.items()})
+    return value
+
+
+def frozen_class(configclass: type):
+    """Return the slot-based class mirroring the fields of `configclass`, generating it the first time."""
+
+    # look only in the class' own dict, a subclass has other fields than its parent
+    cached = configclass.__dict__.get('__frozen_class__')
+    if cached is not None:
+        return cached
+
+    from .core import is_config_field
+
+    fields = tuple(field for field in sorted(configclass.__dict__)
+                   if is_config_field(field) and not callable(configclass.__dict__[field]))
+
+    frozen = type('Frozen' + configclass.__name__, (FrozenConfig,), {
+        '__slots__': fields,
+        '__fields__': fields,
+        '__config_class__': configclass,
+        '__module__': configclass.__module__,
+    })
+
+    configclass.__frozen_class__ = frozen
+    return frozen
+
+
+def freeze(config: 'configlib.core.BaseConfig'):
+    """Return an immutable snapshot of the current values of the config."""
+
+    cls = frozen_class(type(config))
+    snapshot = object.__new__(cls)
+
+    for field in cls.__fields__:
+        value = config[field]
+        if isinstance(config.__type__(field), conftypes.SubConfigType):
+            value = freeze(value)
+        else:
+            value = _freeze_value(value)
+        object.__setattr__(snapshot, field, value)
+
+    return snapshot
@@ -0,0 +1,208 @@
+"""
+Append-only journal of the changes of a configuration.
+
+With `__journal__ = True`, a config does not rewrite its whole file on each change.
+Every change is appended as one line to `<__config_path__>.journal` and the
+other processes replay the lines they did not see yet with `__refresh__()`.
+The file at `__config_path__` becomes a checkpoint: the journal is folded
+into it by `__save__()` or when it grows bigger than `__journal_max_bytes__`.
+
+All the reads and writes of the journal are done while holding a `fcntl.flock`
+on `<__config_path__>.lock`, so processes on the same host never lose updates.
+
+The first line of the journal is a header with a random generation id, which
+changes each time the journal is folded into the checkpoint. A process that
+sees an other generation than its own reloads the checkpoint and then
+replays the whole journal, otherwise it only reads the lines after its offset.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+if TYPE_CHECKING:
+    import configlib
+
+LOGGER = logging.getLogger("configlib")
+
+
+class Journal(object):
+    """The journal of changes of one config instance."""
+
+    def __init__(self, config: 'configlib.core.BaseConfig'):
+        if fcntl is None:
+            raise ValueError('The journal mode needs fcntl, which is not available on this platform')
+
+        self.config = config
+        self.path = config.__config_path__ + '.journal'
+        self.lock_path = config.__config_path__ + '.lock'
+
+        # what we already applied: the generation of the journal and the position in it
+        self.generation = None
+        self.offset = 0
+
+        self._lock_fd = None
+        # the flock is per process: the threads of this process take this lock first
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._exclusive = False
+
+    # Locking
+
+    @contextmanager
+    def lock(self, exclusive=True):
+        """
+        Hold the lock shared between processes. It can be taken again by the same thread.
+
+        Only one thread of the process holds it at a time, even when `exclusive` is False.
+        """
+
+        with self._thread_lock:
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+
+            if self._depth == 0 or exclusive and not self._exclusive:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive
+
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+                    self._exclusive = False
+
+    def close(self):
+        """Close the lock file. It is opened again if the journal is used afterwards."""
+        # while the lock is held, the file is closed by the next call, or when the journal is collected
+        if not self._thread_lock.acquire(blocking=False):
+            return
+        try:
+            if self._lock_fd is not None and self._depth == 0:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+        finally:
+            self._thread_lock.release()
+
+    def __del__(self):
+        self.close()
+
+    @contextmanager
+    def locked(self):
+        """Hold the exclusive lock with the config up to date, so read-modify-write updates are safe."""
+        with self.lock(exclusive=True):
+            self._sync()
+            yield self.config
+
+    # Public operations
+
+    def refresh(self, strict=False):
+        """Apply the changes written by the other processes."""
+        with self.lock(exclusive=False):
+            self._sync(strict)
+
+    def append(self, field: str, value):
+        """Write the change of a field, already converted to its json form."""
+
+        with self.lock(exclusive=True):
+            # the others may have appended since we last read
+            self._sync()
+            # which may have put back an older value of the field we are writing
+            self._apply(field, value)
+
+            with open(self.path, 'ab') as f:
+                if f.tell() == 0:
+                    # no journal yet, or it was removed
+                    self._write_header(f)
+                f.write(self._encode({'f': field, 'v': value}))
+                self.offset = f.tell()
+
+            if self.offset > self.config.__journal_max_bytes__:
+                self.compact()
+
+    def compact(self):
+        """Fold the journal into the config file and start a new journal."""
+
+        with self.lock(exclusive=True):
+            self._sync()
+            self.config.__write__()
+
+            # the checkpoint is written before the journal is reset,
+            # so a crash in between only replays changes already in the checkpoint
+            with open(self.path + '.tmp', 'wb') as f:
+                self._write_header(f)
+                offset = f.tell()
+            os.replace(self.path + '.tmp', self.path)
+            self.offset = offset
+
+            LOGGER.info('Compacted the journal of %s', self.config.__config_path__)
+
+    # Implementation
+
+    def _write_header(self, f):
+        self.generation = uuid.uuid4().hex
+        f.write(json.dumps({'generation': self.generation}).encode() + b'\n')
+
+    def _encode(self, record: dict):
+        engine = self.config.__engine__()
+        if self.config.__xor_key__:
+            # __crypt__ only works on ascii
+            line = base64.b64encode(self.config.__crypt__(engine.dumps(record).encode()))
+        else:
+            line = engine.dumpb(record)
+        return line + b'\n'
+
+    def _decode(self, line: bytes):
+        if self.config.__xor_key__:
+            line = self.config.__decrypt__(base64.b64decode(line))
+        return self.config.__engine__().loads(line)
+
+    def _sync(self, strict=False):
+        """Bring the config up to date with the journal. The lock must be held."""
+
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                generation = json.loads(header.decode())['generation'] if header.endswith(b'\n') else None
+                if generation == self.generation:
+                    f.seek(max(self.offset, f.tell()))
+                lines = f.read()
+                offset = f.tell()
+        except FileNotFoundError:
+            generation, lines, offset = None, b'', 0
+
+        config = self.config
+        with config.__loading_scope__():
+            if generation != self.generation or self.generation is None:
+                # the journal was compacted by someone else, or we never read anything
+                LOGGER.debug('Reloading %s from its checkpoint', config.__config_path__)
+                config.__update__(config.__read__(), strict)
+
+            for line in lines.splitlines():
+                record = self._decode(line)
+                try:
+                    config[record['f']] = record['v']
+                except ValueError:
+                    LOGGER.warning('Could not apply %r from the journal', record)
+                    if strict:
+                        raise
+
+        self.generation = generation
+        self.offset = offset
+
+    def _apply(self, field: str, value):
+        """Set a field from its json form, without writing it to the journal again."""
+        with self.config.__loading_scope__():
+            self.config[field] = value
@@ -0,0 +1,177 @@
+"""
+Upgrade saved configurations to the current `__version__`.
+
+Register a function for each version step with the `__migration__` decorator.
+It receives the json dict of the config in the old version and returns
+the one in the new version:
+
+    @Config.__migration__(1, 2)
+    def split_name(conf):
+        conf['first_name'], _, conf['last_name'] = conf.pop('name', '').partition(' ')
+        return conf
+
+When a config file of an older version is loaded, the migrations are chained
+up to the current version. If there is no way to get there, or if one of the
+functions raises, a warning names the file and the failed step and the defaults
+are restored as before. Nothing is written until the config is saved.
+
+A whole directory of config files can be migrated in parallel, each file being
+replaced atomically, with
+
+    python -m configlib.migrations package.module:Config configs/ --jobs 8
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import click
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+
+class MigrationError(ValueError):
+    """A config can not be upgraded: there is no chain of migrations, or one of them failed."""
+
+
+def register(configclass: type, from_version, to_version):
+    """Return a decorator registering a migration of `configclass` from `from_version` to `to_version`."""
+
+    def decorator(func: 'Callable[[dict], dict]'):
+        # only the class' own migrations, not those of its parents
+        registry = configclass.__dict__.get('__migrations__')
+        if registry is None:
+            registry = {}
+            configclass.__migrations__ = registry
+
+        if from_version in registry:
+            raise ValueError('There is already a migration of %s from version %s' % (configclass.__name__,
+                                                                                     from_version))
+        registry[from_version] = (to_version, func)
+        return func
+
+    return decorator
+
+
+def migrate(configclass: type, document: dict):
+    """
+    Upgrade the json dict of a config to `configclass.__version__`.
+
+    :raise MigrationError: if there is no chain of migrations to the current version,
+        or if a migration function raises.
+    """
+
+    registry = configclass.__dict__.get('__migrations__', {})
+    target = configclass.__version__
+    version = document.get('__version__', target)
+    seen = {version}
+
+    while version != target:
+        if version not in registry:
+            raise MigrationError('there is no migration from version %s' % (version,))
+
+        new_version, func = registry[version]
+        if new_version in seen:
+            raise MigrationError('the migrations loop on version %s' % (new_version,))
+        seen.add(new_version)
+
+        try:
+            document = func(dict(document))
+        except Exception as e:
+            raise MigrationError('the migration from version %s to %s failed with %s: %s'
+                                 % (version, new_version, type(e).__name__, e)) from e
+        document['__version__'] = version = new_version
+
+    return document
+
+
+# Batch migration
+
+_worker_class = None  # type: type
+
+
+def _init_worker(spec):
+    global _worker_class
+    from .core import import_config_class
+    _worker_class = import_config_class(spec)
+
+
+def migrate_file(configclass: type, path: str):
+    """Migrate the config file at `path` in place. Return a json serializable report."""
+
+    from .core import atomic_write
+
+    # an instance that is never initialised: we just need its methods, not to load a config
+    config = object.__new__(configclass)
+
+    try:
+        with open(path, 'rb') as f:
+            document = config.__decode__(f.read())
+
+        version = document.get('__version__', configclass.__version__)
+        if version == configclass.__version__:
+            return {'file': path, 'status': 'skipped', 'from': version}
+
+        atomic_write(path, config.__encode__(migrate(configclass, document)))
+    except Exception as e:
+        # including the errors of the migration functions, one bad file should not stop the batch
+        return {'file': path, 'status': 'failed', 'error': '%s: %s' % (type(e).__name__, e)}
+
+    return {'file': path, 'status': 'migrated', 'from': version}
+
+
+def _migrate_in_worker(path):
+    return migrate_file(_worker_class, path)
+
+
+def migrate_files(spec: str, paths, jobs=None):
+    """
+    Migrate many config files in parallel.
+
+    :param spec: the config class, as 'package.module:ClassName', so the workers can import it
+    :return: an iterator on the reports of each file, as they are done
+    """
+
+    paths = list(paths)
+    # big chunks, but still a few per process to balance the work
+    chunksize = max(1, len(paths) // (4 * (jobs or os.cpu_count() or 1)))
+
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(spec,)) as pool:
+        yield from pool.map(_migrate_in_worker, paths, chunksize=chunksize)
+
+
+@click.command()
+@click.argument('config-class')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('-j', '--jobs', type=int, default=None, help='Number of processes. Defaults to the number of CPUs.')
+def cli(config_class, paths, jobs):
+    """
+    Migrate config files of CONFIG_CLASS (package.module:ClassName) to its current version.
+
+    PATHS are files or directories, in which all the .json files are migrated.
+    Print a json report per file, then a summary, and exit with 1 if any file failed.
+    """
+
+    from .core import import_config_class
+    from .schema import find_config_files
+
+    engine = object.__new__(import_config_class(config_class)).__engine__()
+    counts = {'migrated': 0, 'skipped': 0, 'failed': 0}
+
+    start = time.perf_counter()
+    for report in migrate_files(config_class, find_config_files(paths), jobs):
+        counts[report['status']] += 1
+        click.echo(engine.dumps(report, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+
+    summary = dict(counts, seconds=round(elapsed, 3), files_per_second=round(sum(counts.values()) / elapsed, 1))
+    click.echo(engine.dumps({'summary': summary}))
+
+    sys.exit(1 if counts['failed'] else 0)
+
+
+if __name__ == '__main__':
+    cli()
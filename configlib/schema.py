@@ -0,0 +1,332 @@
+"""
+JSON Schema of a configuration and fast validation of config files.
+
+`Config.__json_schema__()` describes the json stored by a config class, with its
+types, hints and defaults. `Config.__validate__(document)` checks a parsed
+config file without creating the config, with a function generated once per
+class as straight-line python. It only looks at the types of the json values
+and never runs the conversions of the fields, like the eval() of `Python`,
+so validating a file never executes anything from it.
+
+A document of an older version is valid if the registered migrations can
+upgrade it, and it is the upgraded document that is checked.
+
+Many files can be checked at once, in parallel, with
+
+    python -m configlib.schema validate package.module:Config configs/ other.json --jobs 8
+
+which prints one json object per file and exits with 1 if any file is invalid.
+"""
+
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import click
+
+from . import conftypes, migrations
+
+if TYPE_CHECKING:
+    import configlib
+
+COLOR_PATTERN = '^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$'
+JSON_ARRAYS = (list, tuple, set, frozenset)
+
+
+def _fields(configclass: type):
+    from .core import is_config_field
+    return [field for field in sorted(configclass.__dict__)
+            if is_config_field(field) and not callable(configclass.__dict__[field])]
+
+
+def _field_type(configclass: type, field: str):
+    return getattr(configclass, '__{}_type__'.format(field))
+
+
+# Schema
+
+def type_schema(type_):
+    """Return the JSON Schema of the values stored for a field of type `type_`."""
+
+    if isinstance(type_, conftypes.SubConfigType):
+        return object_schema(type_.sub_config_class)
+    if isinstance(type_, conftypes._ColorType):
+        return {'anyOf': [
+            {'type': 'string', 'pattern': COLOR_PATTERN},
+            {'type': 'array', 'items': {'type': 'integer', 'minimum': 0, 'maximum': 255},
+             'minItems': 3, 'maxItems': 3},
+        ]}
+    if isinstance(type_, conftypes._PathType):
+        return {'type': 'string'}
+    if isinstance(type_, conftypes.Python):
+        type_ = type_.type
+
+    if type_ is bool:
+        return {'type': 'boolean'}
+    if type_ is int:
+        return {'type': 'integer'}
+    if type_ is float:
+        return {'type': 'number'}
+    if type_ is str:
+        return {'type': 'string'}
+    if type_ in JSON_ARRAYS:
+        return {'type': 'array'}
+    if type_ is dict:
+        return {'type': 'object'}
+
+    # a custom ConfigType, we can't know what it stores
+    return {}
+
+
+def object_schema(configclass: type):
+    """Return the JSON Schema of the json dict of a Config or SubConfig class."""
+
+    from .core import sub
+
+    properties = {}
+    for field in _fields(configclass):
+        type_ = _field_type(configclass, field)
+        schema = type_schema(type_)
+
+        hint = configclass.__dict__.get('__{}_hint__'.format(field))
+        if hint:
+            schema['description'] = hint
+
+        default = configclass.__dict__[field]
+        if isinstance(type_, conftypes.SubConfigType):
+            if isinstance(default, sub):
+                default = default.sub_config_class(default.dct)
+            schema['default'] = default.__get_json_dict__()
+        elif isinstance(type_, conftypes.ConfigType):
+            schema['default'] = type_.save(default)
+        else:
+            schema['default'] = default
+
+        properties[field] = schema
+
+    properties['__version__'] = {'const': configclass.__version__}
+
+    schema = {'type': 'object', 'properties': properties}
+    if configclass.__doc__:
+        schema['description'] = configclass.__doc__.strip()
+    return schema
+
+
+def json_schema(configclass: type):
+    """Return the JSON Schema (draft 7) of the files of `configclass`."""
+
+    schema = {'$schema': 'http://json-schema.org/draft-07/schema#', 'title': configclass.__name__}
+    schema.update(object_schema(configclass))
+    return schema
+
+
+# Compiled validator
+
+class _ValidatorBuilder(object):
+    """Generate the source of the validation function of a config class."""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {'COLOR': re.compile(COLOR_PATTERN)}
+
+    def emit(self, depth, line):
+        self.lines.append('    ' * depth + line)
+
+    def constant(self, value):
+        """Make `value` available in the generated code and return its name."""
+        name = '_c%d' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def error(self, depth, path, expected, var):
+        self.emit(depth, 'errors.append((%r, %r + type(%s).__name__))' % (path, 'expected %s, got ' % expected, var))
+
+    def check_object(self, configclass, var, prefix, depth):
+        for field in _fields(configclass):
+            type_ = _field_type(configclass, field)
+            path = prefix + field
+            value = 'v%d' % depth
+
+            self.emit(depth, 'if %r in %s:' % (field, var))
+            self.emit(depth + 1, '%s = %s[%r]' % (value, var, field))
+            self.check_value(type_, value, path, depth + 1)
+
+    def check_value(self, type_, var, path, depth):
+        if isinstance(type_, conftypes.Python):
+            # what is saved is the python value itself, never a string to eval
+            type_ = type_.type
+
+        if isinstance(type_, conftypes.SubConfigType):
+            self.emit(depth, 'if not isinstance(%s, dict):' % var)
+            self.error(depth + 1, path, 'object', var)
+            self.emit(depth, 'else:')
+            # avoids an empty else
+            self.emit(depth + 1, 'pass')
+            self.check_object(type_.sub_config_class, var, path + '.', depth + 1)
+        elif isinstance(type_, conftypes._ColorType):
+            self.emit(depth, 'if not (isinstance(%s, str) and COLOR.match(%s) or '
+                             'isinstance(%s, list) and len(%s) == 3 and '
+                             'all(type(c) is int and 0 <= c < 256 for c in %s)):' % ((var,) * 5))
+            self.error(depth + 1, path, 'color', var)
+        elif isinstance(type_, conftypes._PathType) or type_ is str:
+            self.emit(depth, 'if not isinstance(%s, str):' % var)
+            self.error(depth + 1, path, 'string', var)
+        elif type_ is bool:
+            self.emit(depth, 'if not isinstance(%s, bool):' % var)
+            self.error(depth + 1, path, 'boolean', var)
+        elif type_ is int:
+            self.emit(depth, 'if not isinstance(%s, int) or isinstance(%s, bool):' % (var, var))
+            self.error(depth + 1, path, 'integer', var)
+        elif type_ is float:
+            self.emit(depth, 'if not isinstance(%s, (int, float)) or isinstance(%s, bool):' % (var, var))
+            self.error(depth + 1, path, 'number', var)
+        elif type_ in JSON_ARRAYS:
+            self.emit(depth, 'if not isinstance(%s, list):' % var)
+            self.error(depth + 1, path, 'array', var)
+        elif type_ is dict:
+            self.emit(depth, 'if not isinstance(%s, dict):' % var)
+            self.error(depth + 1, path, 'object', var)
+        elif isinstance(type_, conftypes.ConfigType):
+            # a custom type: we can't know what it stores, and its load() could run anything from the file
+            self.emit(depth, 'pass')
+        else:
+            name = self.constant(type_)
+            self.emit(depth, 'if not isinstance(%s, %s):' % (var, name))
+            self.error(depth + 1, path, getattr(type_, '__name__', str(type_)), var)
+
+    def build(self, configclass):
+        self.emit(0, 'def validate(document):')
+        self.emit(1, 'errors = []')
+        self.emit(1, 'if not isinstance(document, dict):')
+        self.error(2, '', 'object', 'document')
+        self.emit(2, 'return errors')
+        self.emit(1, 'if document.get("__version__", %r) != %r:' % (configclass.__version__, configclass.__version__))
+        # as when the config is loaded
+        self.emit(2, 'try:')
+        self.emit(3, 'document = %s(%s, document)' % (self.constant(migrations.migrate), self.constant(configclass)))
+        # a version that is not even hashable is not a MigrationError
+        self.emit(2, 'except Exception as e:')
+        self.emit(3, 'errors.append(("__version__", "can not upgrade version %r to {}: %s" % '
+                     '(document["__version__"], e)))'.format(configclass.__version__))
+        self.check_object(configclass, 'document', '', 1)
+        self.emit(1, 'return errors')
+        return '\n'.join(self.lines) + '\n'
+
+
+def compile_validator(configclass: type):
+    """
+    Return a function that validates a parsed config file of `configclass`.
+
+    The function returns the list of the (dotted path, message) of each error, empty if the document is valid.
+    It is generated once per class, its source is in its `__source__` attribute.
+    """
+
+    # the class' own dict: subclasses have other fields
+    validator = configclass.__dict__.get('__validator__')
+    if validator is not None:
+        return validator
+
+    builder = _ValidatorBuilder()
+    source = builder.build(configclass)
+    code = compile(source, '<validator of %s>' % configclass.__qualname__, 'exec')
+    exec(code, builder.namespace)
+
+    validator = builder.namespace['validate']
+    validator.__source__ = source
+    configclass.__validator__ = validator
+    return validator
+
+
+# Command line
+
+_worker_class = None  # type: type
+
+
+def _init_worker(spec):
+    global _worker_class
+    from .core import import_config_class
+    _worker_class = import_config_class(spec)
+
+
+def validate_file(configclass: type, path: str):
+    """Read, parse and validate a config file. Return a json serializable report."""
+
+    # an instance that is never initialised: we just need its methods, not to load a config
+    config = object.__new__(configclass)  # type: configlib.core.BaseConfig
+
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        document = config.__decode__(data)
+    except (OSError, ValueError) as e:
+        errors = [('', 'cannot read the file: %s' % e)]
+    else:
+        errors = compile_validator(configclass)(document)
+
+    return {'file': path, 'valid': not errors, 'errors': [{'path': p, 'message': m} for p, m in errors]}
+
+
+def _validate_in_worker(path):
+    return validate_file(_worker_class, path)
+
+
+def find_config_files(paths):
+    """Yield the given files and the .json files in the given directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith('.json'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+@click.group()
+def cli():
+    """Schema and validation of configlib configurations."""
+
+
+@cli.command()
+@click.argument('config-class')
+def schema(config_class):
+    """Print the JSON Schema of CONFIG_CLASS (package.module:ClassName)."""
+    from .core import import_config_class
+    configclass = import_config_class(config_class)
+    engine = object.__new__(configclass).__engine__()
+    click.echo(engine.dumps(json_schema(configclass), indent=True))
+
+
+@cli.command()
+@click.argument('config-class')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('-j', '--jobs', type=int, default=None, help='Number of processes. Defaults to the number of CPUs.')
+def validate(config_class, paths, jobs):
+    """
+    Validate config files of CONFIG_CLASS (package.module:ClassName).
+
+    PATHS are files or directories, in which all the .json files are checked.
+    Print a json report per file and exit with 1 if any is invalid.
+    """
+
+    from .core import import_config_class
+    configclass = import_config_class(config_class)
+    engine = object.__new__(configclass).__engine__()
+    files = list(find_config_files(paths))
+
+    # big chunks, but still a few per process to balance the work
+    chunksize = max(1, len(files) // (4 * (jobs or os.cpu_count() or 1)))
+
+    all_valid = True
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(config_class,)) as pool:
+        for report in pool.map(_validate_in_worker, files, chunksize=chunksize):
+            all_valid &= report['valid']
+            click.echo(engine.dumps(report, ensure_ascii=False))
+
+    sys.exit(0 if all_valid else 1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,440 @@
+"""
+Serve one configuration to all the processes of a host over a unix socket.
+
+Instead of having every process open and parse the config file, one server
+owns it and the others ask it. A client can also subscribe to the changes,
+and the server pushes them as soon as a field is set.
+
+Start the server with
+
+    python -m configlib.server package.module:Config /tmp/config.sock
+
+and in the other processes, use a `RemoteConfig` with the same fields:
+
+    class Remote(configlib.server.RemoteConfig, Config):
+        __socket_path__ = '/tmp/config.sock'
+
+    config = Remote()  # always up to date
+
+Each message is a json object, preceded by its length in 4 bytes, big-endian.
+The requests are
+
+    {"op": "get"}                                  -> {"ok": true, "value": <the whole config>}
+    {"op": "get", "path": "colors.light"}          -> {"ok": true, "value": <the field>}
+    {"op": "set", "path": "age", "value": 42}      -> {"ok": true}
+    {"op": "save"}                                 -> {"ok": true}
+    {"op": "subscribe"}                            -> {"ok": true, "value": <the whole config>}
+
+and after a subscribe, the server only sends `{"op": "delta", "path": ..., "value": ...}`
+on this connection, each time a field is set. Errors are `{"ok": false, "error": "..."}`.
+Values are always in their json form, as in the config file.
+
+Each subscriber has its own queue of messages, sent by its own thread, so a
+client that does not read never blocks the server. When it has more than
+`max_pending` messages waiting, it is disconnected.
+"""
+
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from typing import TYPE_CHECKING
+
+import click
+
+from .core import BaseConfig, Config, import_config_class, is_config_field
+from .engine import get_engine
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+LOGGER = logging.getLogger("configlib")
+
+HEADER = struct.Struct('>I')
+ENGINE = get_engine()
+
+
+def encode_message(message: dict):
+    """Return the bytes sent for a message, with its length."""
+    data = ENGINE.dumpb(message)
+    return HEADER.pack(len(data)) + data
+
+
+def send_message(sock: socket.socket, message: dict):
+    sock.sendall(encode_message(message))
+
+
+def _recv_exactly(sock: socket.socket, size: int):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError('Connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket):
+    """Read one message. Raise EOFError when the connection is closed."""
+    size, = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return ENGINE.loads(_recv_exactly(sock, size))
+
+
+# Server
+
+class _Handler(socketserver.BaseRequestHandler):
+    server = None  # type: ConfigServer
+
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (EOFError, OSError):
+                return
+
+            if isinstance(message, dict) and message.get('op') == 'subscribe':
+                subscriber = self.server.subscribe(self.request)
+                # the connection is now only used to push the changes, we wait until it is closed
+                try:
+                    while self.request.recv(1024):
+                        pass
+                except OSError:
+                    pass
+                self.server.unsubscribe(subscriber)
+                return
+
+            try:
+                answer = self.server.answer(message)
+            except Exception as e:
+                # a bad request must not kill the connection
+                LOGGER.debug('Refusing %r: %s', message, e)
+                answer = {'ok': False, 'error': '%s: %s' % (type(e).__name__, e)}
+
+            try:
+                send_message(self.request, answer)
+            except OSError:
+                return
+
+
+class _Subscriber(object):
+    """A subscribed connection and the messages waiting to be sent to it by its thread."""
+
+    def __init__(self, sock: socket.socket, max_pending: int):
+        self.sock = sock
+        self.queue = queue.Queue(max_pending)
+        self.thread = threading.Thread(target=self._send_all, name='configlib-subscriber', daemon=True)
+
+    def push(self, data: bytes):
+        """Queue an encoded message. Return False if the subscriber has too many messages waiting."""
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            return False
+        return True
+
+    def close(self):
+        # wakes up the thread if it is blocked in sendall, and the handler waiting for the socket to close
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        # or if it waits for a message
+        self.push(None)
+
+    def _send_all(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                return
+
+
+class ConfigServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serve a config over the unix socket at `socket_path`.
+
+    :param config: the config that the server owns
+    :param autosave: if not None, save the config at most once every `autosave` seconds
+        instead of after each change.
+    :param max_pending: the number of changes a subscriber can have waiting to be sent
+        before it is disconnected.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: BaseConfig, socket_path: str, autosave=None, max_pending=1024):
+        self.config = config
+        self.socket_path = socket_path
+        self.autosave = autosave
+        self.max_pending = max_pending
+        self._lock = threading.RLock()
+        self._subscribers = []  # type: list[_Subscriber]
+        self._thread = None  # type: threading.Thread
+
+        if os.path.exists(socket_path):
+            # left by a server that did not stop cleanly
+            os.remove(socket_path)
+
+        super().__init__(socket_path, _Handler)
+
+        if autosave is not None:
+            config.__autosave__(autosave)
+
+    def answer(self, message: dict):
+        """Compute the answer to a request."""
+
+        if not isinstance(message, dict):
+            raise ValueError('A request must be a json object')
+
+        op = message.get('op')
+        path = message.get('path')
+        if op not in ('get', 'set', 'save'):
+            raise ValueError('Unknown operation %r' % (op,))
+        if not (isinstance(path, str) or path is None and op != 'set'):
+            raise ValueError('The path must be a string, not %r' % (path,))
+
+        with self._lock:
+            if op == 'get':
+                if path is None:
+                    return {'ok': True, 'value': self.config.__get_json_dict__()}
+                if path not in self.config:
+                    raise KeyError('%s is not a field of the configuration' % path)
+                return {'ok': True, 'value': self.config.__get_json_value__(path)}
+
+            if op == 'set':
+                if path not in self.config:
+                    raise KeyError('%s is not a field of the configuration' % path)
+                self.config[path] = message['value']
+                if self.autosave is None:
+                    self.config.__save__()
+                self.publish(path)
+                return {'ok': True}
+
+            if op == 'save':
+                self.config.__save__()
+                return {'ok': True}
+
+    def subscribe(self, sock: socket.socket):
+        subscriber = _Subscriber(sock, self.max_pending)
+        with self._lock:
+            # queued under the lock, so no change is missed or sent before the snapshot
+            subscriber.push(encode_message({'ok': True, 'value': self.config.__get_json_dict__()}))
+            self._subscribers.append(subscriber)
+        subscriber.thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+        subscriber.close()
+
+    def publish(self, path: str):
+        """Queue the new value of a field for all the subscribers. Those too late are disconnected."""
+
+        # encoded once for everyone
+        data = encode_message({'op': 'delta', 'path': path, 'value': self.config.__get_json_value__(path)})
+        with self._lock:
+            for subscriber in list(self._subscribers):
+                if not subscriber.push(data):
+                    LOGGER.warning('Disconnecting a subscriber that does not read the changes')
+                    self._subscribers.remove(subscriber)
+                    subscriber.close()
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='configlib-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving, disconnect the subscribers and save the config."""
+
+        self.shutdown()
+        self.server_close()
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.close()
+            self._subscribers = []
+
+        if self.autosave is not None:
+            self.config.__autosave__(None)
+
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+# Client
+
+class ConfigClient(object):
+    """Connection to a ConfigServer."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._sock = self._connect()
+        self._lock = threading.Lock()
+        self._subscription = None  # type: socket.socket
+        self._callback = None  # type: Callable[[str, object], None]
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        return sock
+
+    def request(self, **message):
+        """Send a request and return the value of the answer. Raise ValueError if the server refused."""
+        with self._lock:
+            send_message(self._sock, message)
+            answer = recv_message(self._sock)
+
+        if not answer['ok']:
+            raise ValueError(answer['error'])
+        return answer.get('value')
+
+    def get(self, path: str = None):
+        if path is None:
+            return self.request(op='get')
+        return self.request(op='get', path=path)
+
+    def set(self, path: str, value):
+        self.request(op='set', path=path, value=value)
+
+    def save(self):
+        self.request(op='save')
+
+    def subscribe(self, callback: 'Callable[[str, object], None]', listen=True):
+        """
+        Call `callback(path, value)` in a background thread each time a field is set.
+
+        :param listen: if False, the changes wait in the socket until `listen()` is called,
+            so the snapshot can be applied before them.
+        :return: the whole config, from which the changes apply.
+        """
+
+        sock = self._connect()
+        send_message(sock, {'op': 'subscribe'})
+        snapshot = recv_message(sock)['value']
+        self._subscription = sock
+        self._callback = callback
+
+        if listen:
+            self.listen()
+        return snapshot
+
+    def listen(self):
+        """Start calling the callback of `subscribe` with the changes."""
+
+        sock, callback = self._subscription, self._callback
+
+        def listen():
+            while True:
+                try:
+                    delta = recv_message(sock)
+                except (EOFError, OSError):
+                    return
+                try:
+                    callback(delta['path'], delta['value'])
+                except Exception:
+                    LOGGER.exception('Could not apply the change of %s', delta['path'])
+
+        threading.Thread(target=listen, name='configlib-subscription', daemon=True).start()
+
+    def close(self):
+        for sock in (self._sock, self._subscription):
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+
+class RemoteConfig(Config):
+    """
+    A Config that is read from a ConfigServer and kept up to date by it.
+
+    Subclass it along with the config class served, and set `__socket_path__`.
+    Setting a field sends it to the server, which saves it and tells the other clients.
+    """
+
+    __socket_path__ = 'config.sock'
+    __client__ = None  # type: ConfigClient
+
+    def __init_subclass__(cls, **kwargs):
+        # the fields are only looked for in the class' own __dict__, so we copy those of the served config
+        for base in cls.__mro__[1:]:
+            if not issubclass(base, BaseConfig) or base in (RemoteConfig, Config, BaseConfig):
+                continue
+
+            for field, value in base.__dict__.items():
+                if not is_config_field(field) or callable(value) or field in cls.__dict__:
+                    continue
+                setattr(cls, field, value)
+                for extra in ('__{}_type__', '__{}_hint__'):
+                    extra = extra.format(field)
+                    if extra in base.__dict__ and extra not in cls.__dict__:
+                        setattr(cls, extra, base.__dict__[extra])
+
+        super().__init_subclass__(**kwargs)
+
+    def __load__(self, strict=False):
+        if self.__client__ is None:
+            self.__client__ = ConfigClient(self.__socket_path__)
+            # the changes made after the snapshot are applied after it, not overwritten by it
+            conf = self.__client__.subscribe(self.__apply__, listen=False)
+            with self.__loading_scope__():
+                self.__update__(conf, strict)
+            self.__client__.listen()
+            return
+
+        conf = self.__client__.get()
+        with self.__loading_scope__():
+            self.__update__(conf, strict)
+
+    def __apply__(self, path: str, value):
+        """Apply a change pushed by the server."""
+        # only for the listener thread: the fields set meanwhile by the others must still be sent
+        with self.__loading_scope__():
+            self[path] = value
+
+    def __changed__(self, field: str):
+        super().__changed__(field)
+
+        if not self.__loading__:
+            self.__client__.set(field, self.__get_json_value__(field))
+
+    def __save__(self):
+        """The server owns the file, so we ask it to save."""
+        self.__client__.save()
+
+
+@click.command()
+@click.argument('config-class')
+@click.argument('socket-path')
+@click.option('--autosave', type=float, default=None,
+              help='Save at most once every AUTOSAVE seconds instead of after each change.')
+def serve(config_class, socket_path, autosave):
+    """Serve the config CONFIG_CLASS (package.module:ClassName) on the unix socket SOCKET_PATH."""
+
+    configclass = import_config_class(config_class)
+    server = ConfigServer(configclass(), socket_path, autosave)
+    click.echo('Serving %s on %s' % (config_class, socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    serve()
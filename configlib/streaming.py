@@ -0,0 +1,126 @@
+"""
+Write a configuration to its file without building it in memory first.
+
+`__get_json_dict__` builds the nested dict of the whole config, then the engine
+builds the whole json string, then the xor key a crypted copy of it. Instead,
+`dump` walks the fields and writes the json piece by piece, crypting each piece
+as it goes, so the memory used does not grow with the size of the config.
+
+The output is exactly the one of `config.__encode__(config.__get_json_dict__())`.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import configlib
+
+# the size of the pieces written to the file
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json(config: 'configlib.core.BaseConfig', engine, indent=True, sort_keys=True, level=0):
+    """
+    Yield the json of the config in small str pieces.
+
+    Their concatenation is `engine.dumps(config.__get_json_dict__(), indent, sort_keys)`.
+    """
+
+    from .core import SubConfig
+
+    keys = list(config)
+    keys.append('__version__')
+    if sort_keys:
+        keys.sort()
+
+    if indent:
+        newline = '\n' + ' ' * (engine.indent * (level + 1))
+        separators = (newline, ',' + newline, ': ')
+    else:
+        newline = ''
+        separators = ('', ',', ':')
+
+    yield '{'
+    for i, key in enumerate(keys):
+        yield separators[0 if i == 0 else 1]
+        yield engine.dumps(key)
+        yield separators[2]
+
+        if key == '__version__':
+            yield engine.dumps(config.__version__)
+            continue
+
+        value = config[key]
+        if isinstance(value, SubConfig):
+            yield from iter_json(value, engine, indent, sort_keys, level + 1)
+        else:
+            text = engine.dumps(config.__get_json_value__(key), indent, sort_keys)
+            # the lines of a list or a dict are indented at the level of the key
+            yield text.replace('\n', newline) if indent else text
+
+    yield newline[:-engine.indent] + '}' if indent else '}'
+
+
+class XorCodec(object):
+    """
+    Streaming version of `BaseConfig.__crypt__`.
+
+    The output of each piece is the one `__crypt__` would give for this part of the whole text.
+    """
+
+    def __init__(self, key: bytes):
+        self.key = key
+        self.position = 0
+
+    def __call__(self, chunk: bytes):
+        size = len(chunk)
+        start = self.position % len(self.key)
+        self.position += size
+
+        # xor the whole chunk at once with python's big integers
+        stream = (self.key[start:] + self.key * (size // len(self.key) + 1))[:size]
+        crypted = (int.from_bytes(chunk, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(size, 'big')
+        # __crypt__ makes a character of each byte and encodes it in utf-8
+        return crypted.decode('latin-1').encode()
+
+
+def _batch(pieces):
+    """Group the pieces in chunks of about CHUNK_SIZE characters."""
+    batch = []
+    size = 0
+    for piece in pieces:
+        batch.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield ''.join(batch)
+
+
+def dump(config: 'configlib.core.BaseConfig', path: str):
+    """Write the config file at `path` atomically, piece by piece. Return the number of bytes written."""
+
+    from .core import BaseConfig, atomic_open, atomic_write
+
+    engine = config.__engine__()
+
+    if not config.__xor_key__:
+        written = 0
+        with atomic_open(path, 'w') as f:
+            for chunk in _batch(iter_json(config, engine)):
+                written += f.write(chunk)
+        return written
+
+    if type(config).__crypt__ is not BaseConfig.__crypt__:
+        # a custom encryption, we can't know if it works by pieces
+        data = config.__encode__(config.__get_json_dict__())
+        atomic_write(path, data)
+        return len(data)
+
+    codec = XorCodec(config.__xor_key__)
+    written = 0
+    with atomic_open(path, 'wb') as f:
+        for chunk in _batch(iter_json(config, engine, indent=False, sort_keys=False)):
+            written += f.write(codec(chunk.encode()))
+    return written
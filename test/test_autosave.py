@@ -0,0 +1,91 @@
+import json
+import os
+import stat
+import time
+
+import configlib
+
+
+class Inner(configlib.SubConfig):
+    light = 1
+
+
+def make_config(tmp_path):
+    class Conf(configlib.Config):
+        __config_path__ = str(tmp_path / 'conf.json')
+
+        counter = 0
+        inner = Inner()
+
+    return Conf()
+
+
+def read(conf):
+    with open(conf.__config_path__) as f:
+        return json.load(f)
+
+
+def test_changes_are_coalesced(tmp_path):
+    conf = make_config(tmp_path)
+    saver = conf.__autosave__(0.2)
+
+    for i in range(100):
+        conf.counter = i
+    conf.inner.light = 5
+
+    time.sleep(0.5)
+    assert read(conf)['counter'] == 99
+    assert read(conf)['inner']['light'] == 5
+
+    stats = saver.stats()
+    assert stats.requested == 101
+    assert stats.performed == 1
+    assert stats.coalesced == stats.requested - stats.performed
+
+    conf.__autosave__(None)
+
+
+def test_stop_flushes(tmp_path):
+    conf = make_config(tmp_path)
+    saver = conf.__autosave__(60)
+
+    conf.counter = 3
+    conf.__autosave__(None)
+
+    assert read(conf)['counter'] == 3
+    assert saver.stats().performed == 1
+    assert not saver.dirty
+
+
+def test_loading_does_not_mark_dirty(tmp_path):
+    conf = make_config(tmp_path)
+    conf.counter = 7
+    conf.__save__()
+
+    saver = conf.__autosave__(60)
+    conf.__load__()
+    assert not saver.dirty
+    conf.__autosave__(None)
+    assert saver.stats().performed == 0
+
+
+def test_save_is_atomic(tmp_path):
+    conf = make_config(tmp_path)
+    conf.__save__()
+    # no temporary file left behind
+    assert [p.name for p in tmp_path.iterdir()] == ['conf.json']
+
+
+def test_save_keeps_links_and_permissions(tmp_path):
+    conf = make_config(tmp_path)
+    target = tmp_path / 'target.json'
+    target.write_text('{}')
+    os.chmod(str(target), 0o600)
+    os.symlink(str(target), conf.__config_path__)
+
+    conf.counter = 3
+    conf.__save__()
+
+    assert os.path.islink(conf.__config_path__)
+    assert json.loads(target.read_text())['counter'] == 3
+    assert stat.S_IMODE(os.stat(str(target)).st_mode) == 0o600
@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+
+import configlib
+from configlib.cache import ConfigCache
+
+
+class Inner(configlib.SubConfig):
+    light = 1
+
+
+class Tenant(configlib.Config):
+    __config_path__ = 'no/such/file.json'
+
+    name = 'default'
+    inner = Inner()
+
+
+def write(path, **fields):
+    with open(str(path), 'w') as f:
+        json.dump(fields, f)
+
+
+def test_for_path_is_not_the_singleton(tmp_path):
+    write(tmp_path / 'a.json', name='a')
+    write(tmp_path / 'b.json', name='b')
+
+    a = Tenant.__for_path__(str(tmp_path / 'a.json'))
+    b = Tenant.__for_path__(str(tmp_path / 'b.json'))
+
+    assert a.name == 'a'
+    assert b.name == 'b'
+    assert a is Tenant.__for_path__(str(tmp_path / 'a.json'))
+    assert a is not Tenant()
+
+    # the default subconfigs are not shared between tenants
+    a.inner.light = 2
+    assert b.inner.light == 1
+    assert Inner.light == 1
+
+
+def test_save_goes_to_the_tenant_file(tmp_path):
+    path = tmp_path / 'a.json'
+    conf = Tenant.__for_path__(str(path))
+    conf.name = 'saved'
+    conf.__save__()
+
+    with open(str(path)) as f:
+        assert json.load(f)['name'] == 'saved'
+    assert not os.path.exists(Tenant.__config_path__)
+
+
+def test_lru_eviction(tmp_path):
+    cache = ConfigCache(Tenant, maxsize=2)
+    paths = [str(tmp_path / ('%d.json' % i)) for i in range(3)]
+
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # 0 is now the most recent
+    cache.get(paths[2])  # evicts 1
+
+    assert paths[0] in cache
+    assert paths[1] not in cache
+    assert cache.get(paths[0]) is first
+
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (2, 3, 1, 2)
+
+
+def test_byte_budget(tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / ('%d.json' % i))
+        write(path, name='x' * 100)
+        paths.append(path)
+
+    cache = ConfigCache(Tenant, maxsize=10, max_bytes=250)
+    for path in paths:
+        cache.get(path)
+
+    info = cache.cache_info()
+    assert info.currsize == 2
+    assert info.evictions == 1
+    assert info.currbytes <= 250
+
+
+def test_reload_when_the_file_changes(tmp_path):
+    path = str(tmp_path / 'a.json')
+    write(path, name='old')
+
+    cache = ConfigCache(Tenant)
+    conf = cache.get(path)
+    assert conf.name == 'old'
+
+    write(path, name='new and longer')
+    assert cache.get(path) is conf
+    assert conf.name == 'new and longer'
+    assert cache.cache_info().invalidations == 1
+
+
+def test_own_saves_are_not_invalidations(tmp_path):
+    path = str(tmp_path / 'a.json')
+    cache = ConfigCache(Tenant)
+    conf = cache.get(path)
+
+    conf.name = 'mine'
+    conf.__save__()
+    assert cache.get(path) is conf
+    assert conf.name == 'mine'
+
+    info = cache.cache_info()
+    assert (info.hits, info.invalidations) == (1, 0)
+    assert info.currbytes == os.path.getsize(path)
+
+    # but the changes of the others still are
+    write(path, name='theirs')
+    assert cache.get(path).name == 'theirs'
+    assert cache.cache_info().invalidations == 1
+
+
+def test_reload_resets_the_removed_fields(tmp_path):
+    path = str(tmp_path / 'a.json')
+    write(path, name='old', inner={'light': 5})
+
+    cache = ConfigCache(Tenant)
+    conf = cache.get(path)
+    assert conf.inner.light == 5
+
+    write(path, inner={'light': 6, 'padding': 'changes the size'})
+    assert cache.get(path) is conf
+    assert conf.name == 'default'
+    assert conf.inner.light == 6
+
+
+def test_a_slow_load_does_not_block_the_others(tmp_path, monkeypatch):
+    hot = str(tmp_path / 'hot.json')
+    cold = str(tmp_path / 'cold.json')
+    write(hot, name='hot')
+    write(cold, name='cold')
+
+    cache = ConfigCache(Tenant)
+    cache.get(hot)
+
+    reading = threading.Event()
+    release = threading.Event()
+    read = Tenant.__read__
+
+    released = []
+
+    def slow_read(self):
+        if self.__config_path__ == cold:
+            reading.set()
+            released.append(release.wait(2))
+        return read(self)
+
+    monkeypatch.setattr(Tenant, '__read__', slow_read)
+
+    results = []
+    loaders = [threading.Thread(target=lambda: results.append(cache.get(cold))) for _ in range(2)]
+    for loader in loaders:
+        loader.start()
+    assert reading.wait(2)
+
+    # while cold.json is being read
+    assert cache.get(hot).name == 'hot'
+
+    release.set()
+    for loader in loaders:
+        loader.join()
+
+    # the hot config did not wait for the end of the read
+    assert released == [True]
+    # both threads got the same config, loaded once
+    assert results[0] is results[1]
+    assert results[0].name == 'cold'
+    assert cache.cache_info().misses == 2
+
+
+def test_evicted_while_reloading(tmp_path, monkeypatch):
+    slow = str(tmp_path / 'slow.json')
+    other = str(tmp_path / 'other.json')
+    write(slow, name='slow')
+    write(other, name='other')
+
+    cache = ConfigCache(Tenant, maxsize=1)
+    conf = cache.get(slow)
+    write(slow, name='changed on disk')
+
+    reading = threading.Event()
+    release = threading.Event()
+    read = Tenant.__read__
+
+    def slow_read(self):
+        if self.__config_path__ == slow:
+            reading.set()
+            release.wait(2)
+        return read(self)
+
+    monkeypatch.setattr(Tenant, '__read__', slow_read)
+
+    reloader = threading.Thread(target=cache.get, args=(slow,))
+    reloader.start()
+    assert reading.wait(2)
+    cache.get(other)  # evicts slow.json while it is reloaded
+    release.set()
+    reloader.join()
+
+    # the reloaded config is back, and the sizes are counted once
+    assert slow in cache
+    assert cache.get(slow) is conf
+    assert conf.name == 'changed on disk'
+    info = cache.cache_info()
+    assert info.currsize == 1
+    assert info.currbytes == os.path.getsize(slow)
+
+
+def test_one_cache_per_class(tmp_path):
+    class Many(Tenant):
+        pass
+
+    barrier = threading.Barrier(8)
+
+    def get(i):
+        barrier.wait()
+        Many.__for_path__(str(tmp_path / ('%d.json' % i)))
+
+    threads = [threading.Thread(target=get, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(Many.__tenants__) == 8
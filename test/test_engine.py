@@ -0,0 +1,100 @@
+import json
+import math
+
+import click
+import pytest
+
+import configlib
+from configlib import engine
+from configlib.cache import new_instance
+
+ENGINES = sorted(engine.ENGINES)
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'unused.json'
+
+    age = 3
+    name = 'Archibald'
+    pets = {'cat': 1}
+    limit = 1.5
+    __pets_type__ = configlib.Python(dict)
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_engines_agree_with_json(name):
+    eng = engine.get_engine(name)
+    data = {'b': [1, 2.5, None], 'a': {'é': True}, 'c': 'text'}
+
+    assert json.loads(eng.dumps(data)) == data
+    assert json.loads(eng.dumps(data, indent=True, sort_keys=True)) == data
+    assert eng.loads(eng.dumpb(data)) == data
+    assert eng.dumps(data).isascii()
+    assert eng.dumps(data, sort_keys=True).index('"a"') < eng.dumps(data, sort_keys=True).index('"b"')
+    assert eng.dumps(data, indent=True).startswith('{\n' + ' ' * eng.indent + '"')
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_engines_fall_back_on_what_they_cannot_encode(name):
+    eng = engine.get_engine(name)
+    assert json.loads(eng.dumps({1: 2 ** 70})) == {'1': 2 ** 70}
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_non_finite_floats_are_kept(name):
+    eng = engine.get_engine(name)
+    data = {'inf': float('inf'), 'neg': [-float('inf')], 'none': None}
+
+    assert eng.loads(eng.dumps(data)) == data
+    assert eng.loads(eng.dumps(data, indent=True, sort_keys=True)) == data
+    assert eng.loads(eng.dumpb(data)) == data
+    assert math.isnan(eng.loads(eng.dumpb(float('nan'))))
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_save_and_load_infinity(tmp_path, name, monkeypatch):
+    monkeypatch.setattr(Conf, '__json_engine__', name)
+    path = str(tmp_path / 'conf.json')
+
+    conf = new_instance(Conf, path)
+    conf.limit = float('inf')
+    conf.__save__()
+
+    assert new_instance(Conf, path).limit == float('inf')
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        engine.get_engine('nope')
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_save_and_load_with_each_engine(tmp_path, name, monkeypatch):
+    monkeypatch.setattr(Conf, '__json_engine__', name)
+    path = str(tmp_path / 'conf.json')
+
+    conf = new_instance(Conf, path)
+    conf.name = 'Zoé'
+    conf.pets = {'dog': 2}
+    conf.__save__()
+
+    loaded = new_instance(Conf, path)
+    assert loaded.name == 'Zoé'
+    assert loaded.pets == {'dog': 2}
+    assert str(loaded) == engine.get_engine(name).dumps(loaded.__get_json_dict__(), indent=True, sort_keys=True)
+
+
+def test_show_prints_the_file_as_it_is(tmp_path, capsys):
+    path = tmp_path / 'conf.json'
+    conf = new_instance(Conf, str(path))
+
+    # indented, as written by __save__ or by hand
+    path.write_text('{\n   "name": "Haddock",\n   "age": 5\n}')
+    conf.__show__()
+    assert click.unstyle(capsys.readouterr().out).strip() == path.read_text()
+
+    # compact: pretty printed
+    path.write_text('{"name":"Haddock","age":5}')
+    conf.__show__()
+    expected = conf.__engine__().dumps({'name': 'Haddock', 'age': 5}, indent=True, sort_keys=True)
+    assert click.unstyle(capsys.readouterr().out).strip() == expected
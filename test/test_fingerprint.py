@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import configlib
+from configlib import conftypes, fingerprint
+from configlib.cache import new_instance
+
+
+class Walls(configlib.SubConfig):
+    east = (255, 0, 0)
+    __east_type__ = conftypes.color
+    west = (0, 255, 0)
+    __west_type__ = conftypes.color
+
+
+class Colors(configlib.SubConfig):
+    light = 1
+    walls = Walls()
+    castle = Walls()
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'no/such/file.json'
+
+    age = 3
+    colors = Colors()
+
+
+def test_same_content_same_fingerprint():
+    a = new_instance(Conf, 'a.json')
+    b = new_instance(Conf, 'b.json')
+    assert a.__fingerprint__() == b.__fingerprint__()
+    assert a['colors'].__fingerprint__() == b['colors'].__fingerprint__()
+
+    a.age = 4
+    assert a.__fingerprint__() != b.__fingerprint__()
+    b.age = 4
+    assert a.__fingerprint__() == b.__fingerprint__()
+
+
+def test_only_the_path_to_the_root_is_invalidated():
+    conf = new_instance(Conf, 'a.json')
+    castle_before = conf.colors.castle.__fingerprint__()
+    walls_before = conf.colors.walls.__fingerprint__()
+    colors_before = conf.colors.__fingerprint__()
+    root_before = conf.__fingerprint__()
+
+    conf.colors.walls.east = (1, 2, 3)
+
+    assert conf.colors.castle.__dict__['__fingerprint_cache__'] == castle_before
+    assert conf.colors.walls.__dict__['__fingerprint_cache__'] is None
+    assert conf.colors.__dict__['__fingerprint_cache__'] is None
+    assert conf.__dict__['__fingerprint_cache__'] is None
+    assert 'castle' in conf.colors.__dict__['__digests__']
+    assert 'walls' not in conf.colors.__dict__['__digests__']
+
+    assert conf.colors.walls.__fingerprint__() != walls_before
+    assert conf.colors.__fingerprint__() != colors_before
+    assert conf.__fingerprint__() != root_before
+
+
+def test_diff():
+    a = new_instance(Conf, 'a.json')
+    b = new_instance(Conf, 'b.json')
+    assert a.__diff__(b) == []
+
+    b['colors.castle.west'] = '#123456'
+    b.age = 12
+    assert a.__diff__(b) == ['age', 'colors.castle.west']
+
+
+def test_stable_across_processes():
+    code = 'from configlib import fingerprint; print(fingerprint.value_digest({"b": [1, 2.5], "a": "é"}))'
+    # from the directory containing the package, wherever the tests are run from
+    root = os.path.dirname(os.path.dirname(os.path.abspath(configlib.__file__)))
+    out = subprocess.check_output([sys.executable, '-c', code], env=dict(os.environ, PYTHONHASHSEED='123'), cwd=root)
+    assert out.decode().strip() == fingerprint.value_digest({'a': 'é', 'b': (1, 2.5)})
+    # the canonical json is part of the format: changing it changes every fingerprint
+    assert fingerprint.value_digest(3) == '4e07408562bedb8b60ce05c1decfe3ad16b72230967de01f640b7e4729b49fce'
@@ -0,0 +1,67 @@
+import pytest
+
+import configlib
+from configlib import conftypes
+
+
+class Inner(configlib.SubConfig):
+    east = (255, 0, 0)
+    __east_type__ = conftypes.color
+
+    names = ['a', 'b']
+    __names_type__ = configlib.Python(list)
+
+
+def make_config(tmp_path):
+    class Conf(configlib.Config):
+        __config_path__ = str(tmp_path / 'conf.json')
+
+        age = 3
+        name = 'Archibald'
+        inner = Inner()
+
+        def method(self):
+            return 42
+
+    return Conf()
+
+
+def test_freeze_values(tmp_path):
+    conf = make_config(tmp_path)
+    conf.age = 12
+    frozen = conf.__freeze__()
+
+    assert frozen.age == 12
+    assert frozen.name == 'Archibald'
+    assert frozen.inner.east == (255, 0, 0)
+    assert frozen['inner.names'] == ('a', 'b')
+    assert list(frozen) == ['age', 'inner', 'name']
+
+    # a snapshot does not follow the live config
+    conf.age = 13
+    assert frozen.age == 12
+
+
+def test_freeze_is_immutable_and_hashable(tmp_path):
+    conf = make_config(tmp_path)
+    frozen = conf.__freeze__()
+
+    with pytest.raises(AttributeError):
+        frozen.age = 4
+    with pytest.raises(AttributeError):
+        frozen.inner.east = (0, 0, 0)
+    with pytest.raises(AttributeError):
+        frozen.other = 3
+
+    assert frozen == conf.__freeze__()
+    assert hash(frozen) == hash(conf.__freeze__())
+
+    conf.age = 5
+    assert frozen != conf.__freeze__()
+
+
+def test_frozen_class_is_cached(tmp_path):
+    conf = make_config(tmp_path)
+    assert type(conf.__freeze__()) is type(conf.__freeze__())
+    assert isinstance(conf.__freeze__(), configlib.FrozenConfig)
+    assert not hasattr(conf.__freeze__(), '__dict__')
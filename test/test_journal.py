@@ -0,0 +1,186 @@
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import configlib
+from configlib.cache import ConfigCache, new_instance
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='the journal needs fcntl')
+
+
+class Inner(configlib.SubConfig):
+    light = 1
+
+
+class Journaled(configlib.Config):
+    __config_path__ = 'unused.json'
+    __journal__ = True
+
+    counter = 0
+    name = 'x'
+    inner = Inner()
+    w0 = 0
+    w1 = 0
+    w2 = 0
+    w3 = 0
+
+
+def open_config(path):
+    # one instance per "process", the singleton would always return the same
+    return new_instance(Journaled, path)
+
+
+def test_changes_are_appended(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    conf = open_config(path)
+    conf.name = 'y'
+    conf.inner.light = 3
+
+    assert not os.path.exists(path)
+    with open(path + '.journal') as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines[1:]] == [{'f': 'name', 'v': 'y'}, {'f': 'inner.light', 'v': 3}]
+
+    assert open_config(path).name == 'y'
+    assert open_config(path).inner.light == 3
+
+
+def test_refresh_replays_the_tail(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    writer = open_config(path)
+    reader = open_config(path)
+
+    writer.counter = 1
+    assert reader.counter == 0
+    reader.__refresh__()
+    assert reader.counter == 1
+
+    # the reader sees the changes made after a compaction too
+    writer.__save__()
+    writer.counter = 2
+    reader.__refresh__()
+    assert reader.counter == 2
+    with open(path) as f:
+        assert json.load(f)['counter'] == 1
+
+
+def test_compaction_when_too_big(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    conf = open_config(path)
+    conf.__journal_max_bytes__ = 500
+
+    for i in range(100):
+        conf.counter = i
+
+    assert os.path.getsize(path + '.journal') <= 500
+    assert open_config(path).counter == 99
+
+
+def _increment(path, index, times):
+    conf = open_config(path)
+    for i in range(times):
+        with conf.__locked__():
+            conf.counter += 1
+        # without the lock, the fields of each process are still all kept
+        conf['w%d' % index] = i + 1
+
+
+def test_no_update_is_lost_between_processes(tmp_path, monkeypatch):
+    # compact a few times during the test
+    monkeypatch.setattr(Journaled, '__journal_max_bytes__', 2000)
+    path = str(tmp_path / 'conf.json')
+    conf = open_config(path)
+
+    ctx = multiprocessing.get_context('fork')
+    processes = [ctx.Process(target=_increment, args=(path, i, 50)) for i in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    assert all(p.exitcode == 0 for p in processes)
+
+    conf.__refresh__()
+    assert conf.counter == 200
+    assert [conf.w0, conf.w1, conf.w2, conf.w3] == [50] * 4
+
+
+def test_two_writers_of_the_same_field(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    a = open_config(path)
+    b = open_config(path)
+
+    a.counter = 1
+    # b replays the change of a before appending its own, it must not keep 1
+    b.counter = 2
+    assert b.counter == 2
+    b.__refresh__()
+    assert b.counter == 2
+
+    a.__refresh__()
+    assert a.counter == 2
+
+
+def test_first_append_over_a_checkpoint(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    with open(path, 'w') as f:
+        json.dump({'name': 'a'}, f)
+
+    conf = open_config(path)
+    # there is no journal yet, so the append reloads the checkpoint first
+    conf.name = 'y'
+
+    assert conf.name == 'y'
+    assert open_config(path).name == 'y'
+
+
+def test_lock_file_is_closed(tmp_path):
+    cache = ConfigCache(Journaled, maxsize=1)
+    first = cache.get(str(tmp_path / 'a.json'))
+    fd = first.__journal_log__._lock_fd
+    assert fd is not None
+
+    cache.get(str(tmp_path / 'b.json'))  # evicts a.json
+    assert first.__journal_log__._lock_fd is None
+    with pytest.raises(OSError):
+        os.fstat(fd)
+
+    # still usable
+    first.counter = 3
+    assert open_config(str(tmp_path / 'a.json')).counter == 3
+
+
+def test_threads_sharing_a_config(tmp_path):
+    path = str(tmp_path / 'conf.json')
+    conf = open_config(path)
+    conf.__journal_max_bytes__ = 1000
+    other = open_config(path)
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.is_set():
+            conf.__refresh__()
+
+    def write_other():
+        # so the refresher has something to replay
+        i = 0
+        while not stop.is_set():
+            i += 1
+            other.w1 = i
+
+    threads = [threading.Thread(target=refresh), threading.Thread(target=write_other),
+               threading.Thread(target=lambda: [conf.__save__() for _ in range(50)])]
+    for thread in threads:
+        thread.start()
+    for i in range(1, 501):
+        conf.counter = i
+    stop.set()
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+
+    assert conf.counter == 500
+    assert open_config(path).counter == 500
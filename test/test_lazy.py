@@ -0,0 +1,100 @@
+import threading
+
+import configlib
+from configlib import conftypes
+from configlib.cache import new_instance
+
+
+class Walls(configlib.SubConfig):
+    _created = 0
+
+    east = (255, 0, 0)
+    __east_type__ = conftypes.color
+
+    def __init__(self, dct=None):
+        type(self)._created += 1
+        super().__init__(dct)
+
+
+class Colors(configlib.SubConfig):
+    light = 1
+    walls = configlib.sub(Walls)
+    castle = configlib.sub(Walls, {'east': '#0000ff'})
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'unused.json'
+
+    colors = configlib.sub(Colors)
+
+
+CREATED_AT_DEFINITION = Walls._created
+
+
+def test_nothing_is_created_at_definition():
+    assert CREATED_AT_DEFINITION == 0
+    assert isinstance(Conf.__colors_type__, conftypes.SubConfigType)
+    assert Conf.__colors_type__.sub_config_class is Colors
+    assert isinstance(Conf.colors, configlib.sub)
+
+
+def test_created_per_instance_on_access(tmp_path):
+    a = new_instance(Conf, str(tmp_path / 'a.json'))
+    b = new_instance(Conf, str(tmp_path / 'b.json'))
+    assert list(a) == ['colors']
+    assert 'colors' not in a.__dict__
+
+    assert a.colors is a.colors
+    assert a.colors is not b.colors
+    assert a.colors.castle.east == [0, 0, 255]
+    assert a.colors.walls.east == (255, 0, 0)
+
+    # changes are tracked like for any other SubConfig
+    fingerprint = a.__fingerprint__()
+    a.colors.walls.east = (0, 0, 0)
+    assert a.__fingerprint__() != fingerprint
+    assert b.colors.walls.east == (255, 0, 0)
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'a.json')
+    conf = new_instance(Conf, path)
+    conf['colors.light'] = 2
+    conf.__save__()
+
+    assert new_instance(Conf, path).colors.light == 2
+    assert new_instance(Conf, path).__get_json_dict__() == conf.__get_json_dict__()
+
+
+def test_reset(tmp_path):
+    conf = new_instance(Conf, str(tmp_path / 'a.json'))
+    conf.colors.light = 5
+    conf.__reset__()
+    assert conf.colors.light == 1
+
+
+def test_first_access_from_two_threads(tmp_path):
+    barrier = threading.Barrier(2)
+
+    class Slow(configlib.SubConfig):
+        light = 1
+
+        def __init__(self, dct=None):
+            # both threads are creating one
+            barrier.wait(2)
+            super().__init__(dct)
+
+    class Racy(configlib.Config):
+        __config_path__ = 'unused.json'
+
+        slow = configlib.sub(Slow)
+
+    conf = object.__new__(Racy)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(conf.slow)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen[0] is seen[1] is conf.slow
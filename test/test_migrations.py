@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+import configlib
+from configlib import migrations
+from configlib.cache import new_instance
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'unused.json'
+    __version__ = 3
+
+    first_name = 'John'
+    last_name = 'Doe'
+    age_in_days = 0
+
+
+@Conf.__migration__(1, 2)
+def split_name(conf):
+    conf['first_name'], _, conf['last_name'] = conf.pop('name').partition(' ')
+    return conf
+
+
+@Conf.__migration__(2, 3)
+def age_in_days(conf):
+    conf['age_in_days'] = conf.pop('age') * 365
+    return conf
+
+
+def write(path, document):
+    path.write_text(json.dumps(document))
+
+
+def test_chain_of_migrations_on_load(tmp_path):
+    path = tmp_path / 'conf.json'
+    write(path, {'__version__': 1, 'name': 'Archibald Haddock', 'age': 2})
+
+    conf = new_instance(Conf, str(path))
+    assert (conf.first_name, conf.last_name, conf.age_in_days) == ('Archibald', 'Haddock', 730)
+
+
+def test_reset_when_there_is_no_migration(tmp_path):
+    path = tmp_path / 'conf.json'
+    write(path, {'__version__': 0, 'first_name': 'Bob'})
+
+    assert new_instance(Conf, str(path)).first_name == 'John'
+
+
+def test_reset_when_a_migration_fails(tmp_path, caplog):
+    path = tmp_path / 'conf.json'
+    write(path, {'__version__': 2, 'name': 'has no age'})
+
+    conf = new_instance(Conf, str(path))
+    assert (conf.first_name, conf.age_in_days) == ('John', 0)
+    assert str(path) in caplog.text
+    assert 'from version 2 to 3 failed with KeyError' in caplog.text
+    # the file is not touched
+    assert json.loads(path.read_text()) == {'__version__': 2, 'name': 'has no age'}
+
+
+def test_migrate_errors():
+    with pytest.raises(migrations.MigrationError):
+        migrations.migrate(Conf, {'__version__': 4})
+    with pytest.raises(ValueError):
+        Conf.__migration__(1, 5)(lambda conf: conf)
+
+    assert migrations.migrate(Conf, {'age_in_days': 3}) == {'age_in_days': 3}
+
+    with pytest.raises(migrations.MigrationError) as error:
+        migrations.migrate(Conf, {'__version__': 2})
+    assert isinstance(error.value.__cause__, KeyError)
+
+
+def test_old_versions_that_can_be_migrated_are_valid():
+    assert Conf.__validate__({'__version__': 1, 'name': 'Archibald Haddock', 'age': 2}) == []
+    # the migrated document is checked
+    assert [path for path, _ in Conf.__validate__({'__version__': 2, 'name': 'A B', 'age': 'old'})] == ['age_in_days']
+
+    errors = Conf.__validate__({'__version__': 2, 'name': 'has no age'})
+    assert [path for path, _ in errors] == ['__version__']
+    assert 'from version 2 to 3 failed' in errors[0][1]
+    assert [path for path, _ in Conf.__validate__({'__version__': 0})] == ['__version__']
+
+
+def test_batch_migration(tmp_path):
+    for i in range(20):
+        write(tmp_path / ('%d.json' % i), {'__version__': 1, 'name': 'Tenant %d' % i, 'age': i})
+    write(tmp_path / 'current.json', {'__version__': 3, 'first_name': 'Current'})
+    write(tmp_path / 'broken.json', {'__version__': 2, 'name': 'has no age'})
+
+    result = CliRunner().invoke(migrations.cli, ['test.test_migrations:Conf', str(tmp_path), '-j', '2'])
+
+    assert result.exit_code == 1
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    summary = lines[-1]['summary']
+    assert (summary['migrated'], summary['skipped'], summary['failed']) == (20, 1, 1)
+
+    migrated = json.loads((tmp_path / '7.json').read_text())
+    assert migrated == {'__version__': 3, 'first_name': 'Tenant', 'last_name': '7', 'age_in_days': 7 * 365}
+    # the failed file is left untouched
+    assert json.loads((tmp_path / 'broken.json').read_text()) == {'__version__': 2, 'name': 'has no age'}
@@ -0,0 +1,117 @@
+import json
+
+from click.testing import CliRunner
+
+import configlib
+from configlib import conftypes, schema
+from configlib.cache import new_instance
+
+
+class Walls(configlib.SubConfig):
+    """The walls"""
+    east = (255, 0, 0)
+    __east_type__ = conftypes.color
+    __east_hint__ = 'Where the sun rises'
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'unused.json'
+    __version__ = 2
+
+    age = 3
+    ratio = 0.5
+    bald = True
+    documents = '.'
+    __documents_type__ = conftypes.path
+    pets = ['cat']
+    __pets_type__ = configlib.Python(list)
+    walls = Walls()
+
+
+def test_json_schema():
+    s = Conf.__json_schema__()
+
+    assert s['title'] == 'Conf'
+    props = s['properties']
+    assert props['age'] == {'type': 'integer', 'default': 3}
+    assert props['ratio']['type'] == 'number'
+    assert props['bald']['type'] == 'boolean'
+    assert props['documents'] == {'type': 'string', 'default': '.'}
+    assert props['pets'] == {'type': 'array', 'default': ['cat']}
+    assert props['__version__'] == {'const': 2}
+
+    walls = props['walls']
+    assert walls['description'] == 'The walls'
+    assert walls['properties']['east']['description'] == 'Where the sun rises'
+    assert walls['properties']['east']['default'] == '#ff0000'
+    assert walls['default'] == {'east': '#ff0000', '__version__': 1}
+
+
+def test_saved_configs_are_valid(tmp_path):
+    conf = new_instance(Conf, str(tmp_path / 'conf.json'))
+    assert Conf.__validate__(conf.__get_json_dict__()) == []
+    assert Conf.__validate__({}) == []
+    assert Conf.__validate__({'walls': {'east': [1, 2, 3]}, 'ratio': 1}) == []
+
+
+def test_errors():
+    errors = Conf.__validate__({
+        '__version__': 1,
+        'age': True,
+        'ratio': 'big',
+        'pets': {},
+        'walls': {'east': '#12'},
+        'unknown': 'fields are ignored',
+    })
+    assert [path for path, message in errors] == ['__version__', 'age', 'pets', 'ratio', 'walls.east']
+    assert Conf.__validate__([]) == [('', 'expected object, got list')]
+
+
+EVALUATED = []
+
+
+def test_validation_never_evaluates_the_file():
+    class Evaluated(configlib.Config):
+        __config_path__ = 'unused.json'
+
+        n = 3
+        __n_type__ = configlib.Python(int)
+        point = (1, 2)
+        __point_type__ = configlib.Python(tuple)
+
+    code = "__import__('test.test_schema').test_schema.EVALUATED.append(1) or 3"
+    errors = Evaluated.__validate__({'n': code, 'point': '(1, 2)'})
+
+    assert EVALUATED == []
+    # strings are not what these fields store
+    assert [path for path, message in errors] == ['n', 'point']
+    assert Evaluated.__validate__({'n': 4, 'point': [3, 4]}) == []
+
+
+def test_validator_is_compiled_once():
+    assert schema.compile_validator(Conf) is schema.compile_validator(Conf)
+    assert 'def validate(document)' in schema.compile_validator(Conf).__source__
+
+
+def test_validate_cli(tmp_path):
+    directory = tmp_path / 'configs'
+    directory.mkdir()
+    for i in range(10):
+        (directory / ('%d.json' % i)).write_text(json.dumps({'age': i}))
+    (directory / 'bad.json').write_text(json.dumps({'age': 'old'}))
+    (directory / 'broken.json').write_text('{')
+
+    result = CliRunner().invoke(schema.cli, ['validate', 'test.test_schema:Conf', str(directory), '-j', '2'])
+
+    assert result.exit_code == 1
+    reports = {json.loads(line)['file'].rpartition('/')[2]: json.loads(line) for line in result.output.splitlines()}
+    assert len(reports) == 12
+    assert reports['3.json']['valid']
+    assert reports['bad.json']['errors'] == [{'path': 'age', 'message': 'expected integer, got str'}]
+    assert not reports['broken.json']['valid']
+
+
+def test_schema_cli():
+    result = CliRunner().invoke(schema.cli, ['schema', 'test.test_schema:Conf'])
+    assert result.exit_code == 0
+    assert json.loads(result.output) == Conf.__json_schema__()
@@ -0,0 +1,192 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import configlib
+from configlib import conftypes
+from configlib.cache import new_instance
+from configlib.server import ConfigClient, ConfigServer, RemoteConfig, recv_message, send_message
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='unix sockets only')
+
+
+class Colors(configlib.SubConfig):
+    light = (255, 255, 255)
+    __light_type__ = conftypes.color
+
+
+class Served(configlib.Config):
+    __config_path__ = 'unused.json'
+
+    age = 3
+    colors = Colors()
+
+
+def wait_for(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def server(tmp_path):
+    # the path of a unix socket is limited to ~100 chars, tmp_path may be too long
+    with tempfile.TemporaryDirectory() as directory:
+        config = new_instance(Served, str(tmp_path / 'conf.json'))
+        server = ConfigServer(config, os.path.join(directory, 'config.sock')).start()
+        yield server
+        server.stop()
+
+
+def test_get_and_set(server):
+    client = ConfigClient(server.socket_path)
+
+    assert client.get()['age'] == 3
+    assert client.get('colors.light') == '#ffffff'
+
+    client.set('colors.light', '#000000')
+    assert server.config.colors.light == [0, 0, 0]
+    assert os.path.exists(server.config.__config_path__)
+
+    with pytest.raises(ValueError):
+        client.set('age', 'not a number')
+    with pytest.raises(ValueError):
+        client.get('nope')
+
+    client.close()
+
+
+def test_bad_requests_are_answered(server):
+    client = ConfigClient(server.socket_path)
+
+    for message in ({'op': 'set', 'value': 1}, {'op': 'get', 'path': 5}, {'op': 'set', 'path': 'age'},
+                    {'op': 'nope'}, {}):
+        with pytest.raises(ValueError):
+            client.request(**message)
+
+    with client._lock:
+        send_message(client._sock, [1, 2])
+        assert recv_message(client._sock)['ok'] is False
+
+    # the connection still works
+    assert client.get('age') == 3
+    client.close()
+
+
+def test_subscribers_receive_the_changes(server):
+    received = []
+    clients = [ConfigClient(server.socket_path) for _ in range(3)]
+    for client in clients:
+        client.subscribe(lambda path, value: received.append((path, value)))
+
+    clients[0].set('age', 5)
+    assert wait_for(lambda: len(received) == 3)
+    assert received == [('age', 5)] * 3
+
+    for client in clients:
+        client.close()
+
+
+def test_remote_config(server):
+    class Remote(RemoteConfig, Served):
+        __socket_path__ = server.socket_path
+
+    remote = Remote()
+    assert list(remote) == ['age', 'colors']
+    assert remote.colors.light == [255, 255, 255]
+
+    # local changes go to the server
+    remote.colors.light = (1, 2, 3)
+    assert server.config.colors.light == [1, 2, 3]
+
+    # and changes from others are pushed
+    other = ConfigClient(server.socket_path)
+    other.set('age', 42)
+    assert wait_for(lambda: remote.age == 42)
+
+    remote.__client__.close()
+    other.close()
+
+
+def test_a_subscriber_that_does_not_read_does_not_block(tmp_path):
+    with tempfile.TemporaryDirectory() as directory:
+        config = new_instance(Served, str(tmp_path / 'conf.json'))
+        server = ConfigServer(config, os.path.join(directory, 'config.sock'), autosave=60, max_pending=10).start()
+
+        # subscribes and never reads the changes
+        stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stuck.connect(server.socket_path)
+        send_message(stuck, {'op': 'subscribe'})
+        assert wait_for(lambda: len(server._subscribers) == 1)
+
+        client = ConfigClient(server.socket_path)
+        for i in range(5000):
+            client.set('age', i)
+        assert client.get('age') == 4999
+
+        # it was too late, so it was dropped
+        assert server._subscribers == []
+
+        client.close()
+        stuck.close()
+        server.stop()
+
+
+def test_local_writes_while_a_change_is_applied(server):
+    entered = threading.Event()
+    release = threading.Event()
+
+    class Remote(RemoteConfig, Served):
+        __socket_path__ = server.socket_path
+
+        def __changed__(self, field):
+            if field == 'age' and threading.current_thread() is not threading.main_thread():
+                # the change pushed by the server is being applied
+                entered.set()
+                release.wait(2)
+            super().__changed__(field)
+
+    remote = Remote()
+    other = ConfigClient(server.socket_path)
+    other.set('age', 42)
+    assert entered.wait(2)
+
+    remote.colors.light = (1, 2, 3)
+    assert server.config.colors.light == [1, 2, 3]
+
+    release.set()
+    assert wait_for(lambda: remote.age == 42)
+    # the pushed change is not sent back
+    assert server.config.age == 42
+
+    remote.__client__.close()
+    other.close()
+
+
+def test_changes_during_the_load_are_not_lost(server):
+    other = ConfigClient(server.socket_path)
+
+    class Remote(RemoteConfig, Served):
+        __socket_path__ = server.socket_path
+
+        def __update__(self, dct, strict=False):
+            if dct.get('age') == 3:
+                # changed after the snapshot was taken, but before it is applied
+                other.set('age', 42)
+                time.sleep(0.1)
+            return super().__update__(dct, strict)
+
+    remote = Remote()
+    assert wait_for(lambda: remote.age == 42)
+    time.sleep(0.1)
+    assert remote.age == 42
+
+    remote.__client__.close()
+    other.close()
@@ -0,0 +1,80 @@
+import pytest
+
+import configlib
+from configlib import conftypes, engine, streaming
+from configlib.cache import new_instance
+
+
+class Walls(configlib.SubConfig):
+    east = (255, 0, 0)
+    __east_type__ = conftypes.color
+
+
+class Colors(configlib.SubConfig):
+    light = 0.5
+    walls = configlib.sub(Walls)
+    empty_list = []
+    __empty_list_type__ = configlib.Python(list)
+
+
+class Conf(configlib.Config):
+    __config_path__ = 'unused.json'
+
+    name = 'Zoé'
+    nested = {'b': [1, {'c': [2, 3]}], 'a': {}}
+    __nested_type__ = configlib.Python(dict)
+    colors = configlib.sub(Colors)
+    bald = True
+
+
+ENGINES = sorted(engine.ENGINES)
+
+
+@pytest.mark.parametrize('name', ENGINES)
+@pytest.mark.parametrize('indent,sort_keys', [(True, True), (False, False), (False, True)])
+def test_same_output_as_the_engine(name, indent, sort_keys, tmp_path):
+    eng = engine.get_engine(name)
+    conf = new_instance(Conf, str(tmp_path / 'conf.json'))
+
+    streamed = ''.join(streaming.iter_json(conf, eng, indent, sort_keys))
+    assert streamed == eng.dumps(conf.__get_json_dict__(), indent, sort_keys)
+
+
+@pytest.mark.parametrize('name', ENGINES)
+@pytest.mark.parametrize('key', [b'', b'secret', bytes(range(200, 256))])
+def test_file_is_unchanged(name, key, tmp_path, monkeypatch):
+    monkeypatch.setattr(Conf, '__json_engine__', name)
+    monkeypatch.setattr(Conf, '__xor_key__', key)
+    # pieces smaller than the key, to check that the codec keeps its position
+    monkeypatch.setattr(streaming, 'CHUNK_SIZE', 3)
+
+    path = tmp_path / 'conf.json'
+    conf = new_instance(Conf, str(path))
+    conf.__save__()
+
+    expected = conf.__encode__(conf.__get_json_dict__())
+    if isinstance(expected, str):
+        expected = expected.encode()
+    assert path.read_bytes() == expected
+
+
+def test_custom_crypt_is_used(tmp_path):
+    class Reversed(configlib.Config):
+        __config_path__ = str(tmp_path / 'conf.json')
+        __xor_key__ = b'unused'
+
+        age = 3
+
+        def __crypt__(self, byte_text):
+            return byte_text[::-1]
+
+        __decrypt__ = __crypt__
+
+    conf = Reversed()
+    conf.age = 4
+    conf.__save__()
+
+    assert (tmp_path / 'conf.json').read_bytes()[::-1].startswith(b'{')
+    conf.age = 0
+    conf.__load__()
+    assert conf.age == 4